@@ -1,15 +1,26 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-from discord.ext import tasks
+import aiohttp
+import asyncio
+import atexit
+import concurrent.futures
+import functools
 import os
 import hashlib
+import heapq
+import inspect
 import io
+import itertools
 import json
 import random
-import requests
+import sqlite3
 from datetime import datetime
 import time
 import threading
+import unicodedata
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlparse
 
 # --- 設定 ---
 TOKEN = os.getenv("DISCORD_TOKEN", "")
@@ -26,20 +37,76 @@ FESTIVALS_API_URL = "https://splatoon3.ink/data/festivals.json"
 XRANK_API_URL = "https://splatoon3.ink/data/xrank/xrank.takoroka.json"
 LOCALE_API_URL = "https://splatoon3.ink/data/locale/ja-JP.json"
 USER_AGENT = "DiscordBot_SplaStageInfo (Contact: chihalu)" # 連絡先を記載
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10") or "10")
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "32") or "32")
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "8") or "8")
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60") or "60")
+SCHEDULE_CACHE_TTL_SECONDS = int(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", "300") or "300")
+SCHEDULE_CACHE_MAX_TTL_SECONDS = int(os.getenv("SCHEDULE_CACHE_MAX_TTL_SECONDS", "7200") or "7200")
+SCHEDULE_CACHE_ERROR_RETRY_SECONDS = int(os.getenv("SCHEDULE_CACHE_ERROR_RETRY_SECONDS", "30") or "30")
+FEST_STATE_TTL_SECONDS = int(os.getenv("FEST_STATE_TTL_SECONDS", "1800") or "1800")
+RENDER_EXECUTOR = (os.getenv("RENDER_EXECUTOR", "thread") or "thread").lower()  # "thread" または "process"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0") or "0")  # 0 なら CPU コア数
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "256") or "256")
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "")  # 空ならディスクキャッシュは使わない
+FONT_PRELOAD = (os.getenv("FONT_PRELOAD", "1") == "1")
+SCALED_ASSET_CACHE_MAX_ENTRIES = int(os.getenv("SCALED_ASSET_CACHE_MAX_ENTRIES", "512") or "512")
+IMAGE_ENCODER = (os.getenv("IMAGE_ENCODER", "png") or "png").lower()  # "png" / "png_fast" / "webp" / "jpeg"
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85") or "85")  # webp / jpeg の画質
+IMAGE_COMPRESS_LEVEL = int(os.getenv("IMAGE_COMPRESS_LEVEL", "1") or "1")  # png_fast の圧縮レベル (0-9)
+GEAR_IMAGE_FETCH_CONCURRENCY = int(os.getenv("GEAR_IMAGE_FETCH_CONCURRENCY", "8") or "8")
+GEAR_IMAGE_CACHE_MAX_AGE_DAYS = float(os.getenv("GEAR_IMAGE_CACHE_MAX_AGE_DAYS", "30") or "30")  # 使われないまま経ったら消す
+GEAR_IMAGE_CACHE_MAX_FILES = int(os.getenv("GEAR_IMAGE_CACHE_MAX_FILES", "2000") or "2000")
+DISCORD_UPLOAD_LIMIT_BYTES = int(os.getenv("DISCORD_UPLOAD_LIMIT_BYTES", str(8 * 1024 * 1024)) or str(8 * 1024 * 1024))
+ALL_COMMANDS_PAGINATED = (os.getenv("ALL_COMMANDS_PAGINATED", "1") == "1")  # 0 なら /all-* はまとめて送信する
+ALL_COMMANDS_VIEW_TIMEOUT_SECONDS = float(os.getenv("ALL_COMMANDS_VIEW_TIMEOUT_SECONDS", "600") or "600")
+COMMAND_METRICS_WINDOW = int(os.getenv("COMMAND_METRICS_WINDOW", "200") or "200")  # /stats で集計する直近の件数
+NOTIFY_PRECOMPUTE_LEAD_SECONDS = int(os.getenv("NOTIFY_PRECOMPUTE_LEAD_SECONDS", "300") or "300")  # 0 で事前描画しない
+SCHEDULER_MAX_SLEEP_SECONDS = int(os.getenv("SCHEDULER_MAX_SLEEP_SECONDS", "1800") or "1800")  # 境界がなくてもこの間隔で確認する
+SCHEDULER_IDLE_POLL_SECONDS = int(os.getenv("SCHEDULER_IDLE_POLL_SECONDS", "600") or "600")
+SCHEDULER_VERIFY_DELAY_SECONDS = (5.0, 30.0)  # 境界の直後に確認するまでの秒数 (この範囲でばらす)
+SCHEDULER_RECHECK_DELAY_SECONDS = (240.0, 360.0)  # 上流の更新が遅れたとき用の再確認
+NOTIFY_PRECOMPUTE_MIN_LEAD_SECONDS = int(os.getenv("NOTIFY_PRECOMPUTE_MIN_LEAD_SECONDS", "30") or "30")
+DISCORD_GLOBAL_REQUESTS_PER_SECOND = float(os.getenv("DISCORD_GLOBAL_REQUESTS_PER_SECOND", "45") or "45")  # Discord の上限 (50/s) より少し下
+DISCORD_ROUTE_BURST = int(os.getenv("DISCORD_ROUTE_BURST", "5") or "5")  # 1ルート (チャンネル等) あたり DISCORD_ROUTE_PERIOD_SECONDS に送れる数
+DISCORD_ROUTE_PERIOD_SECONDS = float(os.getenv("DISCORD_ROUTE_PERIOD_SECONDS", "5") or "5")
+DISCORD_SEND_WORKERS = int(os.getenv("DISCORD_SEND_WORKERS", "4") or "4")
+NOTIFY_BATCH_WINDOW_SECONDS = float(os.getenv("NOTIFY_BATCH_WINDOW_SECONDS", "1") or "1")  # 同じチャンネルへの通知をまとめて1通にする待ち時間
+NOTIFY_FANOUT_CONCURRENCY = int(os.getenv("NOTIFY_FANOUT_CONCURRENCY", "5") or "5")  # 通知先チャンネルを同時に取得する数
+STATE_BACKEND = (os.getenv("STATE_BACKEND", "sqlite") or "sqlite").strip().lower()  # sqlite / json
+STATE_HISTORY_LIMIT = int(os.getenv("STATE_HISTORY_LIMIT", "200") or "200")  # 送信履歴・ギアのスナップショットを機能ごとに残す件数
+STATE_FLUSH_DELAY_SECONDS = float(os.getenv("STATE_FLUSH_DELAY_SECONDS", "2") or "2")  # 状態の変更をまとめて書き出すまでの秒数
+ATTACHMENT_URL_CACHE_ENABLED = (os.getenv("ATTACHMENT_URL_CACHE", "1") == "1")
+ATTACHMENT_URL_EXPIRY_MARGIN_SECONDS = int(os.getenv("ATTACHMENT_URL_EXPIRY_MARGIN_SECONDS", "600") or "600")
+ATTACHMENT_URL_FALLBACK_TTL_SECONDS = int(os.getenv("ATTACHMENT_URL_FALLBACK_TTL_SECONDS", "43200") or "43200")
+
+class _SplaBot(commands.Bot):
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            _stop_rotation_scheduler()
+            _OUTBOUND.stop()
+            await asyncio.to_thread(_flush_and_close_state)
+            await _close_http_session()
+            _shutdown_render_executor()
 
 # Botの基本設定
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='/', intents=intents)
+bot = _SplaBot(command_prefix='/', intents=intents)
 
 IMG_DIR = os.path.join(os.path.dirname(__file__), "img")
 WEAPON_IMG_DIR = os.path.join(os.path.dirname(__file__), "img", "武器")
 FONT_PATH = os.path.join(os.path.dirname(__file__), "BlitzBold.otf")
 KANJI_FONT_PATH = os.path.join(os.path.dirname(__file__), "FOT-KurokaneStd-EB.otf")
 NAMEPLATE_DIR = os.path.join(os.path.dirname(__file__), "img", "ネームプレート")
+BRAND_LOGO_DIR = os.path.join(os.path.dirname(__file__), "img", "ギアブランド")
 STATE_PATH = os.path.join(os.path.dirname(__file__), ".bot_state.json")
 GEAR_NOTIFY_STATE_PATH = os.path.join(os.path.dirname(__file__), ".gear_notify_state.json")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH") or os.path.join(os.path.dirname(__file__), ".bot_state.sqlite3")
 LOCK_DIR = os.path.join(os.path.dirname(__file__), ".locks")
+GEAR_IMAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache", "gear")
 STAGE_NOTIFY_CHANNEL_ID = int(os.getenv("STAGE_NOTIFY_CHANNEL_ID", "0") or "0")
 STAGE_NOTIFY_ON_START = (os.getenv("STAGE_NOTIFY_ON_START", "0") == "1")
 EVENT_NOTIFY_CHANNEL_ID = int(os.getenv("EVENT_NOTIFY_CHANNEL_ID", "0") or "0")
@@ -55,78 +122,469 @@ GEAR_NOTIFY_ON_START = (os.getenv("GEAR_NOTIFY_ON_START", "0") == "1")
 XRANK_NOTIFY_CHANNEL_ID = int(os.getenv("XRANK_NOTIFY_CHANNEL_ID", "0") or "0")
 COOP_MONTHLY_NOTIFY_CHANNEL_ID = int(os.getenv("COOP_MONTHLY_NOTIFY_CHANNEL_ID", "0") or "0")
 BOT_ACTIVITY_NAME = os.getenv("BOT_ACTIVITY_NAME", "Splatoon")
+ASSET_INDEX_REFRESH_SECONDS = float(os.getenv("ASSET_INDEX_REFRESH_SECONDS", "60") or "60")
 
 _LOCALE_CACHE: dict | None = None
-_NAMEPLATE_CACHE: list[str] | None = None
+# ディレクトリ -> {"mtime_ns", "checked_at", "files": {名前: {拡張子: パス}}, "paths": [...]}
+_ASSET_INDEX: dict[str, dict] = {}
+_ASSET_INDEX_LOCK = threading.Lock()
 
 
-def _nameplate_paths() -> list[str]:
-    global _NAMEPLATE_CACHE
-    if _NAMEPLATE_CACHE is not None:
-        return _NAMEPLATE_CACHE
+def _asset_key(name: str) -> str:
+    # API の名前とファイル名で濁点の合成(NFC)/分解(NFD)や全角/半角が違っても一致させる
+    return unicodedata.normalize("NFKC", name)
+
+
+def _scan_asset_dir(directory: str) -> dict:
+    files: dict[str, dict[str, str]] = {}
     try:
-        files = os.listdir(NAMEPLATE_DIR)
-    except Exception:
-        _NAMEPLATE_CACHE = []
-        return _NAMEPLATE_CACHE
-    paths = []
-    for name in files:
-        if name.lower().endswith((".png", ".webp", ".jpg", ".jpeg")):
-            paths.append(os.path.join(NAMEPLATE_DIR, name))
-    _NAMEPLATE_CACHE = paths
-    return _NAMEPLATE_CACHE
+        dir_mtime = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it if entry.is_file()]
+    except OSError:
+        return {"mtime_ns": None, "files": {}, "paths": []}
+
+    # 正規化形だけが違う重複ファイルは1つにまとめる (NFC のファイル名を優先)
+    entries.sort(key=lambda entry: (not unicodedata.is_normalized("NFC", entry.name), entry.name))
+    for entry in entries:
+        stem, ext = os.path.splitext(entry.name)
+        variants = files.setdefault(_asset_key(stem), {})
+        ext = ext.lower()
+        if ext in variants:
+            continue
+        variants[ext] = entry.path
+    paths = sorted(path for variants in files.values() for path in variants.values())
+    return {"mtime_ns": dir_mtime, "files": files, "paths": paths}
+
+
+def _asset_dir_index(directory: str) -> dict:
+    """ディレクトリの画像一覧を返す。ディレクトリの mtime が変わったときだけ走査し直す"""
+    now = time.monotonic()
+    with _ASSET_INDEX_LOCK:
+        index = _ASSET_INDEX.get(directory)
+    if index is not None and now - index["checked_at"] < ASSET_INDEX_REFRESH_SECONDS:
+        return index
 
-def _load_state() -> dict:
     try:
-        with open(STATE_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-    except Exception:
-        pass
-    return {}
+        dir_mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        dir_mtime = None
+    if index is None or index["mtime_ns"] != dir_mtime:
+        index = _scan_asset_dir(directory)
+    index["checked_at"] = now
+    with _ASSET_INDEX_LOCK:
+        _ASSET_INDEX[directory] = index
+    return index
+
+
+def _build_asset_index() -> None:
+    for directory in (IMG_DIR, WEAPON_IMG_DIR, BRAND_LOGO_DIR, NAMEPLATE_DIR):
+        _asset_dir_index(directory)
+
+
+def _find_asset(directory: str, name: str | None, exts: tuple[str, ...]) -> str | None:
+    if not name or name == "不明":
+        return None
+    variants = _asset_dir_index(directory)["files"].get(_asset_key(name))
+    if not variants:
+        return None
+    for ext in exts:
+        path = variants.get(ext)
+        if path:
+            return path
+    return None
+
 
-def _save_state(state: dict) -> None:
+def _asset_mtime_ns(path: str) -> int | None:
+    if os.path.dirname(path) == GEAR_IMAGE_CACHE_DIR:
+        # ダウンロードしたギア画像は URL ごとに中身が変わらず、mtime は最終使用時刻 (掃除用) なので使わない。
+        # 件数も多いので索引には載せない
+        return 0 if os.path.isfile(path) else None
+    # 同じ名前のまま上書きされてもディレクトリの mtime は変わらないので、索引ではなくファイル自体を stat する
     try:
-        with open(STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving state: {e}")
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _nameplate_paths() -> list[str]:
+    return [
+        path
+        for path in _asset_dir_index(NAMEPLATE_DIR)["paths"]
+        if path.lower().endswith((".png", ".webp", ".jpg", ".jpeg"))
+    ]
+
+class _JsonStateBackend:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading state {self.path}: {e}")
+        return {}
+
+    def save(self, state: dict, changed: set[str]) -> None:
+        body = json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")
+        _write_file_atomic(self.path, body)
+
+
+_STATE_DB: sqlite3.Connection | None = None
+_STATE_DB_LOCK = threading.Lock()
+
+def _state_db() -> sqlite3.Connection:
+    global _STATE_DB
+    if _STATE_DB is None:
+        os.makedirs(os.path.dirname(STATE_DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(STATE_DB_PATH, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS notify_channels (
+                feature TEXT PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rotation_keys (
+                feature TEXT PRIMARY KEY,
+                rotation_key TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sent_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                feature TEXT NOT NULL,
+                channel_id INTEGER,
+                message_id INTEGER NOT NULL,
+                rotation_key TEXT,
+                sent_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sent_messages_feature ON sent_messages (feature, id);
+            CREATE INDEX IF NOT EXISTS sent_messages_channel ON sent_messages (feature, channel_id, id);
+            CREATE TABLE IF NOT EXISTS notify_subscriptions (
+                feature TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (feature, channel_id)
+            );
+            CREATE INDEX IF NOT EXISTS notify_subscriptions_channel ON notify_subscriptions (channel_id);
+            CREATE TABLE IF NOT EXISTS gear_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                signature TEXT,
+                items TEXT NOT NULL,
+                captured_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS gear_snapshots_kind ON gear_snapshots (kind, id);
+            CREATE TABLE IF NOT EXISTS kv (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            """
+        )
+        _STATE_DB = conn
+    return _STATE_DB
+
+def _close_state_db() -> None:
+    global _STATE_DB
+    with _STATE_DB_LOCK:
+        if _STATE_DB is not None:
+            _STATE_DB.close()
+            _STATE_DB = None
+
+
+class _SqliteStateBackend:
+    """通知先・ローテーションキー・送信履歴・ギアのスナップショットを SQLite に保存する。
+
+    _StateStore からは従来どおりのフラットな dict に見えるよう、キー名で各テーブルへ振り分ける。
+    """
+
+    _CHANNEL_SUFFIX = "_notify_channel_id"
+    _SUBSCRIPTIONS_SUFFIX = "_notify_channel_ids"
+    _ROTATION_SUFFIX = "_last_rotation_key"
+    _MESSAGE_SUFFIX = "_last_message_id"
+    _MESSAGES_SUFFIX = "_last_message_ids"
+    _GEAR_PREFIX = "gesotown_"
+
+    def __init__(self, scope: str, legacy_path: str | None = None) -> None:
+        self.scope = scope
+        self.legacy_path = legacy_path
+
+    def load(self) -> dict:
+        with _STATE_DB_LOCK:
+            conn = _state_db()
+            self._migrate_legacy(conn)
+            state: dict = {}
+            for key, value in conn.execute("SELECT key, value FROM kv WHERE scope = ?", (self.scope,)):
+                state[key] = json.loads(value)
+            kv_keys = set(state)
+            if self.scope == "bot":
+                for feature, channel_id in conn.execute("SELECT feature, channel_id FROM notify_channels"):
+                    state[feature + self._CHANNEL_SUFFIX] = channel_id
+                for feature, rotation_key in conn.execute("SELECT feature, rotation_key FROM rotation_keys"):
+                    state[feature + self._ROTATION_SUFFIX] = rotation_key
+                for feature, channel_id in conn.execute(
+                    "SELECT feature, channel_id FROM notify_subscriptions ORDER BY feature, created_at"
+                ):
+                    state.setdefault(feature + self._SUBSCRIPTIONS_SUFFIX, [])
+                    state[feature + self._SUBSCRIPTIONS_SUFFIX].append(channel_id)
+                for feature, channel_id, message_id in conn.execute(
+                    "SELECT feature, channel_id, message_id FROM sent_messages"
+                    " WHERE id IN (SELECT MAX(id) FROM sent_messages GROUP BY feature, channel_id)"
+                ):
+                    if channel_id is None:
+                        state[feature + self._MESSAGE_SUFFIX] = message_id
+                    elif feature + self._MESSAGES_SUFFIX not in kv_keys:
+                        # 移行した1チャンネル分の履歴しかないときだけ、履歴から組み立てる
+                        state.setdefault(feature + self._MESSAGES_SUFFIX, {})[str(channel_id)] = message_id
+            elif self.scope == "gear":
+                for kind, signature, items in conn.execute(
+                    "SELECT kind, signature, items FROM gear_snapshots"
+                    " WHERE id IN (SELECT MAX(id) FROM gear_snapshots GROUP BY kind)"
+                ):
+                    state[f"{self._GEAR_PREFIX}{kind}_sig"] = signature
+                    state[f"{self._GEAR_PREFIX}{kind}_items"] = json.loads(items)
+            return state
+
+    def save(self, state: dict, changed: set[str]) -> None:
+        now = time.time()
+        with _STATE_DB_LOCK:
+            conn = _state_db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(conn, state, changed, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, conn: sqlite3.Connection, state: dict, changed: set[str], now: float) -> None:
+        gear_kinds: set[str] = set()
+        for key in changed:
+            value = state.get(key)
+            if self.scope == "bot" and key.endswith(self._CHANNEL_SUFFIX):
+                feature = key[: -len(self._CHANNEL_SUFFIX)]
+                if value:
+                    conn.execute(
+                        "INSERT INTO notify_channels (feature, channel_id, updated_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT(feature) DO UPDATE SET channel_id = excluded.channel_id, updated_at = excluded.updated_at",
+                        (feature, int(value), now),
+                    )
+                else:
+                    conn.execute("DELETE FROM notify_channels WHERE feature = ?", (feature,))
+            elif self.scope == "bot" and key.endswith(self._ROTATION_SUFFIX):
+                feature = key[: -len(self._ROTATION_SUFFIX)]
+                if value is not None:
+                    conn.execute(
+                        "INSERT INTO rotation_keys (feature, rotation_key, updated_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT(feature) DO UPDATE SET rotation_key = excluded.rotation_key, updated_at = excluded.updated_at",
+                        (feature, str(value), now),
+                    )
+                else:
+                    conn.execute("DELETE FROM rotation_keys WHERE feature = ?", (feature,))
+            elif self.scope == "bot" and key.endswith(self._SUBSCRIPTIONS_SUFFIX):
+                feature = key[: -len(self._SUBSCRIPTIONS_SUFFIX)]
+                channel_ids = [int(channel_id) for channel_id in value or []]
+                conn.execute(
+                    f"DELETE FROM notify_subscriptions WHERE feature = ? AND channel_id NOT IN ({','.join('?' * len(channel_ids))})",
+                    (feature, *channel_ids),
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO notify_subscriptions (feature, channel_id, created_at) VALUES (?, ?, ?)",
+                    [(feature, channel_id, now + i * 1e-6) for i, channel_id in enumerate(channel_ids)],
+                )
+                # 明示的に空にした購読は kv に残し、ステージ通知先へのフォールバックと区別する
+                if value is not None and not channel_ids:
+                    conn.execute(
+                        "INSERT INTO kv (scope, key, value) VALUES (?, ?, '[]') ON CONFLICT(scope, key) DO UPDATE SET value = '[]'",
+                        (self.scope, key),
+                    )
+                else:
+                    conn.execute("DELETE FROM kv WHERE scope = ? AND key = ?", (self.scope, key))
+            elif self.scope == "bot" and key.endswith(self._MESSAGE_SUFFIX):
+                feature = key[: -len(self._MESSAGE_SUFFIX)]
+                if not value:
+                    # 消したメッセージ ID が再起動後に戻らないよう、送信先のない履歴を消しておく
+                    conn.execute("DELETE FROM sent_messages WHERE feature = ? AND channel_id IS NULL", (feature,))
+                    continue
+                channel_feature = _NOTIFY_MESSAGE_CHANNEL_FEATURES.get(feature, feature)
+                self._insert_sent_message(
+                    conn, feature, state.get(channel_feature + self._CHANNEL_SUFFIX), int(value), state, now
+                )
+            elif self.scope == "bot" and key.endswith(self._MESSAGES_SUFFIX):
+                feature = key[: -len(self._MESSAGES_SUFFIX)]
+                for channel_id, message_id in (value or {}).items():
+                    if message_id:
+                        self._insert_sent_message(conn, feature, int(channel_id), int(message_id), state, now)
+                # sent_messages は履歴なので、今の送信先ごとの ID は kv に持つ (外れたチャンネルを戻さない)
+                conn.execute(
+                    "INSERT INTO kv (scope, key, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT(scope, key) DO UPDATE SET value = excluded.value",
+                    (self.scope, key, json.dumps(value or {}, ensure_ascii=False)),
+                )
+            elif self.scope == "gear" and key.startswith(self._GEAR_PREFIX) and key.endswith(("_sig", "_items")):
+                gear_kinds.add(key[len(self._GEAR_PREFIX):].rsplit("_", 1)[0])
+            elif value is None:
+                conn.execute("DELETE FROM kv WHERE scope = ? AND key = ?", (self.scope, key))
+            else:
+                conn.execute(
+                    "INSERT INTO kv (scope, key, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT(scope, key) DO UPDATE SET value = excluded.value",
+                    (self.scope, key, json.dumps(value, ensure_ascii=False)),
+                )
+        for kind in sorted(gear_kinds):
+            conn.execute(
+                "INSERT INTO gear_snapshots (kind, signature, items, captured_at) VALUES (?, ?, ?, ?)",
+                (
+                    kind,
+                    state.get(f"{self._GEAR_PREFIX}{kind}_sig"),
+                    json.dumps(state.get(f"{self._GEAR_PREFIX}{kind}_items") or [], ensure_ascii=False),
+                    now,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM gear_snapshots WHERE kind = ? AND id <= ("
+                " SELECT id FROM gear_snapshots WHERE kind = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (kind, kind, max(1, STATE_HISTORY_LIMIT)),
+            )
+
+    def _insert_sent_message(
+        self, conn: sqlite3.Connection, feature: str, channel_id: int | None, message_id: int, state: dict, now: float
+    ) -> None:
+        if conn.execute(
+            "SELECT 1 FROM sent_messages WHERE feature = ? AND channel_id IS ? AND message_id = ?",
+            (feature, channel_id, message_id),
+        ).fetchone():
+            return
+        conn.execute(
+            "INSERT INTO sent_messages (feature, channel_id, message_id, rotation_key, sent_at) VALUES (?, ?, ?, ?, ?)",
+            (feature, channel_id, message_id, state.get(feature + self._ROTATION_SUFFIX), now),
+        )
+        conn.execute(
+            "DELETE FROM sent_messages WHERE feature = ? AND channel_id IS ? AND id <= ("
+            " SELECT id FROM sent_messages WHERE feature = ? AND channel_id IS ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (feature, channel_id, feature, channel_id, max(1, STATE_HISTORY_LIMIT)),
+        )
+
+    def _migrate_legacy(self, conn: sqlite3.Connection) -> None:
+        # 旧 JSON ファイルは初回だけ取り込む (ファイル自体は残しておく)
+        marker = f"migrated:{self.scope}"
+        if conn.execute("SELECT 1 FROM kv WHERE scope = '_meta' AND key = ?", (marker,)).fetchone():
+            return
+        legacy = _JsonStateBackend(self.legacy_path).load() if self.legacy_path else {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if legacy:
+                self._write(conn, legacy, set(legacy), time.time())
+            conn.execute(
+                "INSERT INTO kv (scope, key, value) VALUES ('_meta', ?, ?)",
+                (marker, json.dumps(self.legacy_path or "")),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if legacy:
+            print(f"Migrated {len(legacy)} {self.scope} state keys from {self.legacy_path}")
+
+
+class _StateStore:
+    """プロセス内に保持する状態。変更は STATE_FLUSH_DELAY_SECONDS ごとにまとめて書き出す。"""
+
+    def __init__(self, backend, label: str) -> None:
+        self.backend = backend
+        self.label = label
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._data: dict | None = None
+        self._dirty: set[str] = set()
+        self._timer: threading.Timer | None = None
+
+    def _ensure_loaded(self) -> dict:
+        if self._data is None:
+            self._data = self.backend.load()
+        return self._data
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._ensure_loaded())
+
+    def update(self, updates: dict) -> None:
+        if not updates:
+            return
+        with self._lock:
+            data = self._ensure_loaded()
+            changed = {key: value for key, value in updates.items() if key not in data or data[key] != value}
+            if not changed:
+                return
+            data.update(changed)
+            self._dirty.update(changed)
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        # self._lock を持った状態で呼ぶ
+        if self._timer is None:
+            self._timer = threading.Timer(max(0.0, STATE_FLUSH_DELAY_SECONDS), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._data is None or not self._dirty:
+                    return
+                changed = self._dirty
+                self._dirty = set()
+                data = dict(self._data)
+            try:
+                self.backend.save(data, changed)
+            except Exception as e:
+                print(f"Error saving {self.label}: {e}")
+                with self._lock:
+                    self._dirty |= changed
+                    # 失敗した分は次の変更を待たずにもう一度書きに行く
+                    self._schedule_flush()
+
+
+if STATE_BACKEND == "json":
+    _BOT_STATE = _StateStore(_JsonStateBackend(STATE_PATH), "state")
+    _GEAR_NOTIFY_STATE = _StateStore(_JsonStateBackend(GEAR_NOTIFY_STATE_PATH), "gear notify state")
+else:
+    _BOT_STATE = _StateStore(_SqliteStateBackend("bot", STATE_PATH), "state")
+    _GEAR_NOTIFY_STATE = _StateStore(_SqliteStateBackend("gear", GEAR_NOTIFY_STATE_PATH), "gear notify state")
 
-_STATE_LOCK = threading.Lock()
+def _load_state() -> dict:
+    return _BOT_STATE.snapshot()
 
 def _update_state(updates: dict) -> None:
-    if not updates:
-        return
-    with _STATE_LOCK:
-        state = _load_state()
-        state.update(updates)
-        _save_state(state)
+    _BOT_STATE.update(updates)
 
 def _load_gear_notify_state() -> dict:
-    try:
-        with open(GEAR_NOTIFY_STATE_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-    except Exception:
-        pass
-    return {}
-
-def _save_gear_notify_state(state: dict) -> None:
-    try:
-        with open(GEAR_NOTIFY_STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving gear notify state: {e}")
+    return _GEAR_NOTIFY_STATE.snapshot()
 
 def _update_gear_notify_state(updates: dict) -> None:
-    if not updates:
-        return
-    with _STATE_LOCK:
-        state = _load_gear_notify_state()
-        state.update(updates)
-        _save_gear_notify_state(state)
+    _GEAR_NOTIFY_STATE.update(updates)
+
+def _flush_state() -> None:
+    _BOT_STATE.flush()
+    _GEAR_NOTIFY_STATE.flush()
+
+def _flush_and_close_state() -> None:
+    _flush_state()
+    _close_state_db()
+
+atexit.register(_flush_and_close_state)
 
 def _acquire_lock(name: str, ttl_seconds: int = 120) -> bool:
     try:
@@ -193,137 +651,301 @@ def _load_dotenv(path: str = ".env") -> None:
     except Exception as e:
         print(f"Error loading .env: {e}")
 
-def get_stages():
-    """APIから現在のステージ情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
+_HTTP_SESSION: aiohttp.ClientSession | None = None
+
+def _get_http_session() -> aiohttp.ClientSession:
+    # 全ての取得処理で共有する keep-alive セッション (イベントループ内から呼ぶこと)
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+        )
+        _HTTP_SESSION = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS),
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _HTTP_SESSION
+
+async def _close_http_session() -> None:
+    global _HTTP_SESSION
+    session = _HTTP_SESSION
+    _HTTP_SESSION = None
+    if session is not None and not session.closed:
+        await session.close()
+
+# URL -> {"data", "expires_at", "etag", "last_modified", "body_hash", "version"}
+_RESPONSE_CACHE: dict[str, dict] = {}
+_RESPONSE_INFLIGHT: dict[str, asyncio.Future] = {}
+# (URL, 利用者) -> 最後に処理したレスポンスの version
+_RESPONSE_SEEN_VERSIONS: dict[tuple[str, str], int] = {}
+
+def _iter_schedule_items(data):
+    # spla3.yuu26.com は {"results": [...]} または {"result": {"regular": [...], ...}} の形
+    if not isinstance(data, dict):
+        return
+    results = data.get("results")
+    if isinstance(results, list):
+        yield from results
+    result = data.get("result")
+    if isinstance(result, dict):
+        for items in result.values():
+            if isinstance(items, list):
+                yield from items
+
+def _current_rotation_end_ts(data, now_ts: float) -> float | None:
+    earliest: float | None = None
+    for item in _iter_schedule_items(data):
+        if not isinstance(item, dict):
+            continue
+        try:
+            start_ts = _parse_iso_datetime(item.get("start_time") or item.get("startTime") or "").timestamp()
+            end_ts = _parse_iso_datetime(item.get("end_time") or item.get("endTime") or "").timestamp()
+        except Exception:
+            continue
+        if start_ts <= now_ts < end_ts and (earliest is None or end_ts < earliest):
+            earliest = end_ts
+    return earliest
+
+def _response_cache_expiry(data, now_ts: float) -> float:
+    # 現在のローテーションの終了時刻が分かればそこまで、分からなければ TTL で失効させる
+    end_ts = _current_rotation_end_ts(data, now_ts)
+    if end_ts is not None:
+        return min(end_ts, now_ts + SCHEDULE_CACHE_MAX_TTL_SECONDS)
+    return now_ts + SCHEDULE_CACHE_TTL_SECONDS
+
+async def _fetch_json_uncached(url: str):
+    entry = _RESPONSE_CACHE.get(url)
+    headers: dict[str, str] = {}
+    if entry is not None:
+        # 前回の検証子を付けて条件付きリクエストにする
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    body: bytes | None = None
+    not_modified = False
+    etag = last_modified = None
     try:
-        response = requests.get(API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
+        async with _get_http_session().get(url, headers=headers) as response:
+            if response.status == 304 and entry is not None:
+                not_modified = True
+            elif response.status == 200:
+                body = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
     except Exception as e:
         print(f"Error fetching data: {e}")
+
+    now_ts = time.time()
+    if not_modified:
+        entry["expires_at"] = _response_cache_expiry(entry["data"], now_ts)
+        return entry["data"]
+
+    data = None
+    body_hash = None
+    if body is not None:
+        body_hash = hashlib.md5(body).hexdigest()
+        if entry is not None and entry.get("body_hash") == body_hash:
+            # 検証子を返さないサーバーでも、本文が同じならパースを省略する
+            data = entry["data"]
+        else:
+            try:
+                data = json.loads(body)
+            except Exception as e:
+                print(f"Error decoding data: {e}")
+
+    if data is None:
+        # 取得失敗時は古いキャッシュを短時間だけ使い回し、上流への連打を避ける
+        if entry is not None:
+            entry["expires_at"] = now_ts + SCHEDULE_CACHE_ERROR_RETRY_SECONDS
+            return entry["data"]
         return None
 
-def get_salmon_schedule():
-    """APIからサーモンランのスケジュール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
+    version = 1
+    if entry is not None:
+        version = entry["version"] if entry.get("body_hash") == body_hash else entry["version"] + 1
+    _RESPONSE_CACHE[url] = {
+        "data": data,
+        "expires_at": _response_cache_expiry(data, now_ts),
+        "etag": etag,
+        "last_modified": last_modified,
+        "body_hash": body_hash,
+        "version": version,
+    }
+    return data
+
+async def _fetch_json(url: str):
+    entry = _RESPONSE_CACHE.get(url)
+    if entry is not None and entry["expires_at"] > time.time():
+        return entry["data"]
+
+    # 同じURLへの同時リクエストは1回の取得にまとめる
+    task = _RESPONSE_INFLIGHT.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_json_uncached(url))
+        _RESPONSE_INFLIGHT[url] = task
+        task.add_done_callback(lambda _t, key=url: _RESPONSE_INFLIGHT.pop(key, None))
+    return await asyncio.shield(task)
+
+def _response_changed(url: str, consumer: str) -> bool:
+    """consumer が最後に処理してから url の内容が更新されたかを返す"""
+    entry = _RESPONSE_CACHE.get(url)
+    if entry is None:
+        return True
+    return _RESPONSE_SEEN_VERSIONS.get((url, consumer)) != entry["version"]
+
+def _mark_response_seen(url: str, consumer: str) -> None:
+    entry = _RESPONSE_CACHE.get(url)
+    if entry is not None:
+        _RESPONSE_SEEN_VERSIONS[(url, consumer)] = entry["version"]
+
+_GEAR_IMAGE_SEMAPHORE: asyncio.Semaphore | None = None
+_GEAR_IMAGE_INFLIGHT: dict[str, asyncio.Future] = {}
+
+def _gear_image_cache_path(url: str) -> str:
+    # ギア画像の URL はギアごとに固定なので、URL のハッシュでディスクに保存する
+    ext = os.path.splitext(url.split("?", 1)[0])[1].lower()
+    if ext not in (".png", ".jpg", ".jpeg", ".webp"):
+        ext = ".img"
+    return os.path.join(GEAR_IMAGE_CACHE_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ext)
+
+def _write_file_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        # 置き換えた後に電源断などで中身が空のファイルが残らないよう、ディスクに書いてから入れ替える
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # 入れ替え (ディレクトリのエントリ) も永続化する。ディレクトリを開けない環境 (Windows) では省く
     try:
-        response = requests.get(SALMON_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+        dir_fd = os.open(os.path.dirname(path), os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
 
-def get_team_contest_schedule():
-    """APIからバイトチームコンテストのスケジュール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
+async def _download_gear_image(url: str) -> str | None:
+    global _GEAR_IMAGE_SEMAPHORE
+    path = _gear_image_cache_path(url)
+    if os.path.exists(path):
+        # 最後に使った時刻を更新日時に残し、掃除で古い順に消せるようにする
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+    if _GEAR_IMAGE_SEMAPHORE is None:
+        _GEAR_IMAGE_SEMAPHORE = asyncio.Semaphore(max(1, GEAR_IMAGE_FETCH_CONCURRENCY))
     try:
-        response = requests.get(TEAM_CONTEST_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
+        async with _GEAR_IMAGE_SEMAPHORE:
+            async with _get_http_session().get(url) as response:
+                if response.status != 200:
+                    print(f"Error fetching gear image {url}: {response.status}")
+                    return None
+                body = await response.read()
+        await asyncio.to_thread(_write_file_atomic, path, body)
     except Exception as e:
-        print(f"Error fetching data: {e}")
+        print(f"Error fetching gear image {url}: {e}")
         return None
+    return path
 
-def get_event_schedule():
-    """APIからイベントマッチのスケジュール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
+def _prune_gear_image_cache() -> None:
+    """ギア画像のディスクキャッシュから、長く使われていないものと上限を超えた古いものを消す"""
     try:
-        response = requests.get(EVENT_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
+        entries = []
+        with os.scandir(GEAR_IMAGE_CACHE_DIR) as it:
+            for entry in it:
+                if entry.is_file():
+                    entries.append((entry.stat().st_mtime, entry.path))
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        print(f"Error scanning gear image cache: {e}")
+        return
+    entries.sort(reverse=True)
+    cutoff = time.time() - GEAR_IMAGE_CACHE_MAX_AGE_DAYS * 86400
+    removed = 0
+    for index, (mtime, path) in enumerate(entries):
+        if index < GEAR_IMAGE_CACHE_MAX_FILES and mtime >= cutoff:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    if removed:
+        print(f"Removed {removed} cached gear images")
+
+async def _fetch_gear_image_path(url: str | None) -> str | None:
+    """ギア画像をディスクキャッシュ経由で取得し、ローカルのパスを返す"""
+    if not url:
         return None
+    task = _GEAR_IMAGE_INFLIGHT.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_download_gear_image(url))
+        _GEAR_IMAGE_INFLIGHT[url] = task
+        task.add_done_callback(lambda _t, key=url: _GEAR_IMAGE_INFLIGHT.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _with_gear_image_paths(items: list[dict]) -> list[dict]:
+    # 全アイテムの画像を並行して取得し、描画側にはローカルのパスだけを渡す
+    paths = await asyncio.gather(*(_fetch_gear_image_path(item.get("image_url")) for item in items))
+    return [{**item, "image_path": path} for item, path in zip(items, paths)]
+
+async def get_stages():
+    """APIから現在のステージ情報を取得する"""
+    return await _fetch_json(API_URL)
+
+async def get_salmon_schedule():
+    """APIからサーモンランのスケジュール情報を取得する"""
+    return await _fetch_json(SALMON_API_URL)
+
+async def get_team_contest_schedule():
+    """APIからバイトチームコンテストのスケジュール情報を取得する"""
+    return await _fetch_json(TEAM_CONTEST_API_URL)
+
+async def get_event_schedule():
+    """APIからイベントマッチのスケジュール情報を取得する"""
+    return await _fetch_json(EVENT_API_URL)
 
-def get_fest_schedule():
+async def get_fest_schedule():
     """APIからフェスのスケジュール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(FEST_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(FEST_API_URL)
 
-def get_fest_challenge_schedule():
+async def get_fest_challenge_schedule():
     """APIからフェスマッチ(チャレンジ)のスケジュール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(FEST_CHALLENGE_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(FEST_CHALLENGE_API_URL)
 
-def get_gear_data():
+async def get_gear_data():
     """APIからゲソタウンのギア情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(GEAR_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(GEAR_API_URL)
 
-def get_coop_data():
+async def get_coop_data():
     """APIからサーモンランのリザルト情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(COOP_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(COOP_API_URL)
 
-def get_festivals_data():
+async def get_festivals_data():
     """APIからフェス情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(FESTIVALS_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(FESTIVALS_API_URL)
 
-def get_xrank_data():
+async def get_xrank_data():
     """APIからXランキング情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(XRANK_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(XRANK_API_URL)
 
-def get_locale_data():
+async def get_locale_data():
     """APIから日本語ロケール情報を取得する"""
-    headers = {"User-Agent": USER_AGENT}
-    try:
-        response = requests.get(LOCALE_API_URL, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return await _fetch_json(LOCALE_API_URL)
 
 def _format_hhmm(iso_datetime: str) -> str:
     return _parse_iso_datetime(iso_datetime).astimezone().strftime("%H:%M")
@@ -367,44 +989,19 @@ def _format_stages(stages) -> str:
     return " / ".join(_extract_stage_names(stages))
 
 def _find_local_image_by_name(name: str) -> str | None:
-    if not name or name == "不明":
-        return None
-
-    for ext in (".webp", ".png", ".jpg", ".jpeg", ".gif"):
-        path = os.path.join(IMG_DIR, f"{name}{ext}")
-        if os.path.exists(path):
-            return path
-
-    return None
+    return _find_asset(IMG_DIR, name, (".webp", ".png", ".jpg", ".jpeg", ".gif"))
 
 def _find_weapon_image_by_name(name: str) -> str | None:
-    if not name or name == "不明":
-        return None
-    if not os.path.isdir(WEAPON_IMG_DIR):
-        return None
-
-    for ext in (".png", ".webp", ".jpg", ".jpeg", ".gif"):
-        path = os.path.join(WEAPON_IMG_DIR, f"{name}{ext}")
-        if os.path.exists(path):
-            return path
-
-    return None
+    return _find_asset(WEAPON_IMG_DIR, name, (".png", ".webp", ".jpg", ".jpeg", ".gif"))
 
 def _safe_attachment_filename(path: str, prefix: str) -> str:
+    # ファイルが差し替えられたら名前も変わるよう mtime も含める (添付 URL キャッシュのキーになる)
     _, ext = os.path.splitext(path)
-    digest = hashlib.md5(path.encode("utf-8")).hexdigest()
+    digest = hashlib.md5(f"{path}:{_asset_mtime_ns(path)}".encode("utf-8")).hexdigest()
     return f"{prefix}_{digest}{ext or ''}"
 
 def _find_local_rule_icon(rule_name: str) -> str | None:
-    if not rule_name or rule_name == "不明":
-        return None
-
-    for ext in (".png", ".webp", ".jpg", ".jpeg", ".gif", ".svg"):
-        path = os.path.join(IMG_DIR, f"{rule_name}{ext}")
-        if os.path.exists(path):
-            return path
-
-    return None
+    return _find_asset(IMG_DIR, rule_name, (".png", ".webp", ".jpg", ".jpeg", ".gif", ".svg"))
 
 def _find_local_mode_icon(mode_key: str) -> str | None:
     mode_to_name = {
@@ -418,279 +1015,440 @@ def _find_local_mode_icon(mode_key: str) -> str | None:
     if not name:
         return None
 
-    for ext in (".png", ".webp", ".jpg", ".jpeg", ".gif"):
-        path = os.path.join(IMG_DIR, f"{name}{ext}")
-        if os.path.exists(path):
-            return path
+    return _find_asset(IMG_DIR, name, (".png", ".webp", ".jpg", ".jpeg", ".gif"))
 
-    return None
+_RENDER_EXECUTOR: concurrent.futures.Executor | None = None
 
-def _render_stage_card_bytes(
-    rule_name: str,
-    rule_icon_path: str | None,
-    stage1_name: str,
-    stage1_path: str | None,
-    stage2_name: str,
-    stage2_path: str | None,
-) -> bytes | None:
+def _get_render_executor() -> concurrent.futures.Executor:
+    global _RENDER_EXECUTOR
+    if _RENDER_EXECUTOR is None:
+        workers = RENDER_WORKERS or os.cpu_count() or 2
+        if RENDER_EXECUTOR == "process":
+            # フォントはプロセスごとに持つため、ワーカー起動時に読み込んでおく
+            _RENDER_EXECUTOR = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_preload_fonts if FONT_PRELOAD else None,
+            )
+        else:
+            _RENDER_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="render",
+            )
+    return _RENDER_EXECUTOR
+
+def _shutdown_render_executor() -> None:
+    global _RENDER_EXECUTOR
+    executor = _RENDER_EXECUTOR
+    _RENDER_EXECUTOR = None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def _run_render(func, *args, **kwargs):
+    """Pillow の描画処理をイベントループの外 (描画プール) で実行する"""
+    loop = asyncio.get_running_loop()
     try:
-        from PIL import Image, ImageDraw, ImageFont  # type: ignore
-    except Exception:
+        return await loop.run_in_executor(_get_render_executor(), functools.partial(func, *args, **kwargs))
+    except Exception as e:
+        print(f"Error rendering image: {e}")
         return None
 
-    def open_image(path: str):
-        _, ext = os.path.splitext(path)
-        ext = ext.lower()
-        if ext == ".svg":
-            try:
-                import cairosvg  # type: ignore
-            except Exception:
-                return None
-            png_bytes = cairosvg.svg2png(url=path)
-            return Image.open(io.BytesIO(png_bytes)).convert("RGBA")
-        return Image.open(path).convert("RGBA")
-
-    def load_font(size: int):
-        for candidate in (
-            FONT_PATH,
-            r"C:\Windows\Fonts\meiryo.ttc",
-            r"C:\Windows\Fonts\YuGothR.ttc",
-            r"C:\Windows\Fonts\msgothic.ttc",
-        ):
-            if os.path.exists(candidate):
-                try:
-                    return ImageFont.truetype(candidate, size=size)
-                except Exception:
-                    pass
-        return ImageFont.load_default()
+_IMAGE_FORMATS = {
+    "png": ("PNG", ".png"),
+    "png_fast": ("PNG", ".png"),
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+def _image_encode_settings_from_env(card_type: str) -> dict:
+    # IMAGE_ENCODER_STAGE などカード種別ごとの指定があれば全体の設定より優先する
+    suffix = card_type.upper()
+    encoder = (os.getenv(f"IMAGE_ENCODER_{suffix}", "") or IMAGE_ENCODER).lower()
+    if encoder not in _IMAGE_FORMATS:
+        print(f"Unknown image encoder {encoder!r} for {card_type}; using png")
+        encoder = "png"
+    return {
+        "encoder": encoder,
+        "quality": int(os.getenv(f"IMAGE_QUALITY_{suffix}", "") or IMAGE_QUALITY),
+        "compress_level": int(os.getenv(f"IMAGE_COMPRESS_LEVEL_{suffix}", "") or IMAGE_COMPRESS_LEVEL),
+    }
 
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
+# カード種別 -> {"encoder", "quality", "compress_level"}
+_IMAGE_ENCODE_SETTINGS = {
+    card_type: _image_encode_settings_from_env(card_type) for card_type in ("stage", "salmon", "gear")
+}
+
+def _image_extension(card_type: str) -> str:
+    return _IMAGE_FORMATS[_IMAGE_ENCODE_SETTINGS[card_type]["encoder"]][1]
+
+def _encode_image(img, card_type: str) -> bytes:
+    """描画したカードをカード種別の設定で Discord 添付用にエンコードする"""
+    settings = _IMAGE_ENCODE_SETTINGS[card_type]
+    encoder = settings["encoder"]
+    if encoder == "png_fast":
+        options = {"compress_level": settings["compress_level"]}
+    elif encoder == "webp":
+        options = {"quality": settings["quality"], "method": 4}
+    elif encoder == "jpeg":
+        options = {"quality": settings["quality"]}
+    else:
+        options = {"optimize": True}
+    out = io.BytesIO()
+    img.convert("RGB").save(out, format=_IMAGE_FORMATS[encoder][0], **options)
+    return out.getvalue()
 
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
+# 描画結果を変える修正をしたら上げる (キャッシュキーに含まれる)
+RENDERER_VERSION = "3"
 
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
+_RENDER_CACHE: OrderedDict[str, bytes] = OrderedDict()
+_RENDER_CACHE_LOCK = threading.Lock()
+_RENDER_INFLIGHT: dict[str, asyncio.Future] = {}
 
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
-
-    def is_kanji(ch: str) -> bool:
-        code = ord(ch)
-        return (
-            0x4E00 <= code <= 0x9FFF
-            or 0x3400 <= code <= 0x4DBF
-            or 0xF900 <= code <= 0xFAFF
-            or 0x20000 <= code <= 0x2A6DF
-            or 0x2A700 <= code <= 0x2B73F
-            or 0x2B740 <= code <= 0x2B81F
-            or 0x2B820 <= code <= 0x2CEAF
-        )
+def _asset_fingerprint(path: str | None) -> str:
+    if not path:
+        return ""
+    return f"{path}:{_asset_mtime_ns(path)}"
 
-    def _font_metrics(font) -> tuple[int, int]:
-        try:
-            return font.getmetrics()
-        except Exception:
-            return (0, 0)
-
-    def measure_text(text: str, base_font, kanji_font) -> tuple[int, int]:
-        total_w = 0
-        max_ascent = 0
-        max_descent = 0
-        tmp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            bbox = tmp_draw.textbbox((0, 0), ch, font=font)
-            total_w += bbox[2] - bbox[0]
-            ascent, descent = _font_metrics(font)
-            if ascent > max_ascent:
-                max_ascent = ascent
-            if descent > max_descent:
-                max_descent = descent
-        return total_w, max_ascent + max_descent
-
-    def draw_text_with_kanji_font(draw, pos: tuple[int, int], text: str, base_font, kanji_font, **kwargs):
-        x, y = pos
-        base_ascent, _ = _font_metrics(base_font)
-        kanji_ascent, _ = _font_metrics(kanji_font)
-        max_ascent = max(base_ascent, kanji_ascent)
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            ascent, _ = _font_metrics(font)
-            draw.text((x, y + (max_ascent - ascent)), ch, font=font, **kwargs)
-            bbox = draw.textbbox((0, 0), ch, font=font)
-            x += bbox[2] - bbox[0]
-
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
-
-    def is_kanji(ch: str) -> bool:
-        code = ord(ch)
-        return (
-            0x4E00 <= code <= 0x9FFF
-            or 0x3400 <= code <= 0x4DBF
-            or 0xF900 <= code <= 0xFAFF
-            or 0x20000 <= code <= 0x2A6DF
-            or 0x2A700 <= code <= 0x2B73F
-            or 0x2B740 <= code <= 0x2B81F
-            or 0x2B820 <= code <= 0x2CEAF
-        )
+def _render_cache_key(kind: str, *parts) -> str:
+    raw = json.dumps([RENDERER_VERSION, kind, *parts], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
-    def _font_metrics(font) -> tuple[int, int]:
-        try:
-            return font.getmetrics()
-        except Exception:
-            return (0, 0)
-
-    def measure_text(text: str, base_font, kanji_font) -> tuple[int, int]:
-        total_w = 0
-        max_ascent = 0
-        max_descent = 0
-        tmp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            bbox = tmp_draw.textbbox((0, 0), ch, font=font)
-            total_w += bbox[2] - bbox[0]
-            ascent, descent = _font_metrics(font)
-            if ascent > max_ascent:
-                max_ascent = ascent
-            if descent > max_descent:
-                max_descent = descent
-        return total_w, max_ascent + max_descent
-
-    def draw_text_with_kanji_font(draw, pos: tuple[int, int], text: str, base_font, kanji_font, **kwargs):
-        x, y = pos
-        base_ascent, _ = _font_metrics(base_font)
-        kanji_ascent, _ = _font_metrics(kanji_font)
-        max_ascent = max(base_ascent, kanji_ascent)
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            ascent, _ = _font_metrics(font)
-            draw.text((x, y + (max_ascent - ascent)), ch, font=font, **kwargs)
-            bbox = draw.textbbox((0, 0), ch, font=font)
-            x += bbox[2] - bbox[0]
-
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
+def _render_cache_get(key: str) -> bytes | None:
+    with _RENDER_CACHE_LOCK:
+        data = _RENDER_CACHE.get(key)
+        if data is not None:
+            _RENDER_CACHE.move_to_end(key)
+        return data
 
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
-
-    def is_kanji(ch: str) -> bool:
-        code = ord(ch)
-        return (
-            0x4E00 <= code <= 0x9FFF
-            or 0x3400 <= code <= 0x4DBF
-            or 0xF900 <= code <= 0xFAFF
-            or 0x20000 <= code <= 0x2A6DF
-            or 0x2A700 <= code <= 0x2B73F
-            or 0x2B740 <= code <= 0x2B81F
-            or 0x2B820 <= code <= 0x2CEAF
-        )
+def _render_cache_put(key: str, data: bytes) -> None:
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE[key] = data
+        _RENDER_CACHE.move_to_end(key)
+        while len(_RENDER_CACHE) > RENDER_CACHE_MAX_ENTRIES:
+            _RENDER_CACHE.popitem(last=False)
 
-    def _font_metrics(font) -> tuple[int, int]:
-        try:
-            return font.getmetrics()
-        except Exception:
-            return (0, 0)
-
-    def measure_text(text: str, base_font, kanji_font) -> tuple[int, int]:
-        total_w = 0
-        max_ascent = 0
-        max_descent = 0
-        tmp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            bbox = tmp_draw.textbbox((0, 0), ch, font=font)
-            total_w += bbox[2] - bbox[0]
-            ascent, descent = _font_metrics(font)
-            if ascent > max_ascent:
-                max_ascent = ascent
-            if descent > max_descent:
-                max_descent = descent
-        return total_w, max_ascent + max_descent
-
-    def draw_text_with_kanji_font(draw, pos: tuple[int, int], text: str, base_font, kanji_font, **kwargs):
-        x, y = pos
-        base_ascent, _ = _font_metrics(base_font)
-        kanji_ascent, _ = _font_metrics(kanji_font)
-        max_ascent = max(base_ascent, kanji_ascent)
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            ascent, _ = _font_metrics(font)
-            draw.text((x, y + (max_ascent - ascent)), ch, font=font, **kwargs)
-            bbox = draw.textbbox((0, 0), ch, font=font)
-            x += bbox[2] - bbox[0]
-
-    # Discord のEmbed内では横幅に合わせて縮小されるため、縦横比を大きめにして見やすくする
-    card_w = 1000
-    card_h = 520
-    pad = 20
-    gap = 16
-    header_h = 64
-    corner_r = 18
-
-    bg = (25, 32, 44, 255)
-    card = Image.new("RGBA", (card_w, card_h), bg)
-    draw = ImageDraw.Draw(card)
+def _render_disk_cache_path(key: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.img")
+
+def _render_disk_cache_read(key: str) -> bytes | None:
+    try:
+        with open(_render_disk_cache_path(key), "rb") as f:
+            return f.read()
+    except Exception:
+        return None
 
-    # header (rule icon + name)
-    icon_size = 40
-    icon_x = pad
-    icon_y = pad + 6
+def _render_disk_cache_write(key: str, data: bytes) -> None:
+    path = _render_disk_cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error writing render cache: {e}")
+
+async def _render_with_cache(key: str, func, *args, **kwargs) -> bytes | None:
+    async def load_or_render() -> bytes | None:
+        data = None
+        if RENDER_CACHE_DIR:
+            data = await asyncio.to_thread(_render_disk_cache_read, key)
+        if data is None:
+            data = await _run_render(func, *args, **kwargs)
+            if data and RENDER_CACHE_DIR:
+                await asyncio.to_thread(_render_disk_cache_write, key, data)
+        if data:
+            _render_cache_put(key, data)
+        return data
+
+    cached = _render_cache_get(key)
+    if cached is not None:
+        return cached
+
+    # 同じカードの描画が同時に来たら1回だけ描く
+    task = _RENDER_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(load_or_render())
+        _RENDER_INFLIGHT[key] = task
+        task.add_done_callback(lambda _t: _RENDER_INFLIGHT.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _render_stage_card_cached(
+    rule_name: str,
+    rule_icon_path: str | None,
+    stage1_name: str,
+    stage1_path: str | None,
+    stage2_name: str,
+    stage2_path: str | None,
+) -> bytes | None:
+    key = _render_cache_key(
+        "stage_card",
+        _IMAGE_ENCODE_SETTINGS["stage"],
+        rule_name,
+        _asset_fingerprint(rule_icon_path),
+        stage1_name,
+        _asset_fingerprint(stage1_path),
+        stage2_name,
+        _asset_fingerprint(stage2_path),
+    )
+    return await _render_with_cache(
+        key,
+        _render_stage_card_bytes,
+        rule_name=rule_name,
+        rule_icon_path=rule_icon_path,
+        stage1_name=stage1_name,
+        stage1_path=stage1_path,
+        stage2_name=stage2_name,
+        stage2_path=stage2_path,
+    )
 
-    icon_img = None
-    if rule_icon_path:
-        icon_img = open_image(rule_icon_path)
+def _salmon_weapon_icon_paths(weapon_names: list[str]) -> list[str]:
+    icon_paths = []
+    for name in weapon_names:
+        if name == "不明":
+            continue
+        icon_path = _find_weapon_image_by_name(name)
+        if icon_path:
+            icon_paths.append(icon_path)
+    return icon_paths
 
-    if icon_img:
-        icon_img = icon_img.resize((icon_size, icon_size), Image.Resampling.LANCZOS)
-        # subtle shadow behind the icon for contrast
+async def _render_salmon_card_cached(stage_path: str | None, weapon_names: list[str]) -> bytes | None:
+    if not stage_path:
+        return None
+    # ブキのアイコンを差し替えたら作り直すよう、解決したファイルの更新時刻もキーに含める
+    key = _render_cache_key(
+        "salmon_card",
+        _IMAGE_ENCODE_SETTINGS["salmon"],
+        _asset_fingerprint(stage_path),
+        list(weapon_names),
+        [_asset_fingerprint(path) for path in _salmon_weapon_icon_paths(weapon_names)],
+    )
+    return await _render_with_cache(key, _render_salmon_stage_with_weapons_bytes, stage_path, list(weapon_names))
+
+# カード描画で使うフォントサイズ (起動時の事前読み込み対象)
+_FONT_PRELOAD_SIZES = (30, 28, 26, 20, 18, 16, 14, 12)
+_FALLBACK_FONT_PATHS = (
+    FONT_PATH,
+    r"C:\Windows\Fonts\meiryo.ttc",
+    r"C:\Windows\Fonts\YuGothR.ttc",
+    r"C:\Windows\Fonts\msgothic.ttc",
+)
+# (フォントパス, サイズ) -> フォント。読み込みに失敗したものは None を記録する
+_FONT_CACHE: dict[tuple[str, int], object] = {}
+_FONT_CACHE_LOCK = threading.Lock()
+
+def _truetype_font(path: str, size: int):
+    key = (path, size)
+    with _FONT_CACHE_LOCK:
+        if key in _FONT_CACHE:
+            return _FONT_CACHE[key]
+    font = None
+    if os.path.exists(path):
         try:
-            from PIL import ImageFilter  # type: ignore
+            from PIL import ImageFont  # type: ignore
 
-            shadow = Image.new("RGBA", (icon_size, icon_size), (0, 0, 0, 0))
-            shadow.alpha_composite(icon_img)
-            shadow = shadow.filter(ImageFilter.GaussianBlur(radius=2))
-            card.alpha_composite(shadow, (icon_x + 1, icon_y + 2))
+            font = ImageFont.truetype(path, size=size)
         except Exception:
-            pass
+            font = None
+    with _FONT_CACHE_LOCK:
+        return _FONT_CACHE.setdefault(key, font)
+
+def _load_font(size: int):
+    for candidate in _FALLBACK_FONT_PATHS:
+        font = _truetype_font(candidate, size)
+        if font is not None:
+            return font
+    from PIL import ImageFont  # type: ignore
+
+    return ImageFont.load_default()
+
+def _load_kanji_font(size: int):
+    font = _truetype_font(KANJI_FONT_PATH, size)
+    if font is not None:
+        return font
+    return _load_font(size)
+
+def _preload_fonts() -> None:
+    try:
+        for size in _FONT_PRELOAD_SIZES:
+            _load_font(size)
+            _load_kanji_font(size)
+    except Exception as e:
+        print(f"Error preloading fonts: {e}")
+
+def _is_kanji(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF
+        or 0x3400 <= code <= 0x4DBF
+        or 0xF900 <= code <= 0xFAFF
+        or 0x20000 <= code <= 0x2A6DF
+        or 0x2A700 <= code <= 0x2B73F
+        or 0x2B740 <= code <= 0x2B81F
+        or 0x2B820 <= code <= 0x2CEAF
+    )
+
+@functools.lru_cache(maxsize=1024)
+def _split_glyph_runs(text: str) -> tuple[tuple[bool, str], ...]:
+    """文字列を (漢字かどうか, 連続した文字列) のまとまりに分ける"""
+    runs: list[tuple[bool, str]] = []
+    for is_kanji, chars in itertools.groupby(text, key=_is_kanji):
+        runs.append((is_kanji, "".join(chars)))
+    return tuple(runs)
+
+# フォントは _FONT_CACHE に常駐するので、フォントオブジェクトをそのままキーにできる
+@functools.lru_cache(maxsize=64)
+def _font_metrics(font) -> tuple[int, int]:
+    try:
+        return font.getmetrics()
+    except Exception:
+        return (0, 0)
+
+@functools.lru_cache(maxsize=4096)
+def _run_width(font, text: str) -> float:
+    try:
+        return font.getlength(text)
+    except Exception:
+        bbox = font.getbbox(text)
+        return bbox[2] - bbox[0]
+
+def _measure_text(text: str, base_font, kanji_font) -> tuple[int, int]:
+    total_w = 0.0
+    max_ascent = 0
+    max_descent = 0
+    for is_kanji, run in _split_glyph_runs(text):
+        font = kanji_font if is_kanji else base_font
+        total_w += _run_width(font, run)
+        ascent, descent = _font_metrics(font)
+        max_ascent = max(max_ascent, ascent)
+        max_descent = max(max_descent, descent)
+    return int(round(total_w)), max_ascent + max_descent
+
+def _draw_text_with_kanji_font(draw, pos: tuple[int, int], text: str, base_font, kanji_font, **kwargs):
+    """漢字だけ別フォントで描く。同じフォントが続く部分はまとめて1回で描画する"""
+    x, y = pos
+    base_ascent, _ = _font_metrics(base_font)
+    kanji_ascent, _ = _font_metrics(kanji_font)
+    max_ascent = max(base_ascent, kanji_ascent)
+    for is_kanji, run in _split_glyph_runs(text):
+        font = kanji_font if is_kanji else base_font
+        ascent, _ = _font_metrics(font)
+        draw.text((x, y + (max_ascent - ascent)), run, font=font, **kwargs)
+        x += _run_width(font, run)
+
+# (パス, mtime, サイズ, 合わせ方) -> 縮小済みの RGBA 画像。呼び出し側で書き換えないこと
+_SCALED_ASSET_CACHE: OrderedDict[tuple, object] = OrderedDict()
+_SCALED_ASSET_CACHE_LOCK = threading.Lock()
+
+def _open_asset_image(path: str):
+    from PIL import Image  # type: ignore
+
+    _, ext = os.path.splitext(path)
+    if ext.lower() == ".svg":
+        try:
+            import cairosvg  # type: ignore
+        except Exception:
+            return None
+        png_bytes = cairosvg.svg2png(url=path)
+        return Image.open(io.BytesIO(png_bytes)).convert("RGBA")
+    return Image.open(path).convert("RGBA")
+
+def _scale_image(img, size: tuple[int, int], fit: str):
+    from PIL import Image  # type: ignore
+
+    w, h = size
+    iw, ih = img.size
+    if fit == "stretch":
+        return img.resize((w, h), Image.Resampling.LANCZOS)
+    if fit == "shrink" and iw <= w and ih <= h:
+        # shrink: 枠に収まるよう縮小のみ行う (拡大はしない)
+        return img
+    if fit in ("contain", "shrink"):
+        scale = min(w / iw, h / ih)
+        return img.resize((max(1, int(iw * scale)), max(1, int(ih * scale))), Image.Resampling.LANCZOS)
+    # cover: 枠いっぱいに拡大して中央で切り抜く
+    scale = max(w / iw, h / ih)
+    nw, nh = int(iw * scale), int(ih * scale)
+    resized = img.resize((nw, nh), Image.Resampling.LANCZOS)
+    left = (nw - w) // 2
+    top = (nh - h) // 2
+    return resized.crop((left, top, left + w, top + h))
+
+def _load_scaled_asset(path: str | None, size: tuple[int, int], fit: str = "cover"):
+    """ローカル画像を読み込んで size に合わせた結果を返す (レイアウトごとに1回だけ縮小する)"""
+    if not path:
+        return None
+    mtime_ns = _asset_mtime_ns(path)
+    if mtime_ns is None:
+        return None
+    key = (path, mtime_ns, size, fit)
+    with _SCALED_ASSET_CACHE_LOCK:
+        cached = _SCALED_ASSET_CACHE.get(key)
+        if cached is not None:
+            _SCALED_ASSET_CACHE.move_to_end(key)
+            return cached
+    try:
+        img = _open_asset_image(path)
+    except Exception:
+        img = None
+    if img is None:
+        return None
+    scaled = _scale_image(img, size, fit)
+    with _SCALED_ASSET_CACHE_LOCK:
+        _SCALED_ASSET_CACHE[key] = scaled
+        _SCALED_ASSET_CACHE.move_to_end(key)
+        while len(_SCALED_ASSET_CACHE) > SCALED_ASSET_CACHE_MAX_ENTRIES:
+            _SCALED_ASSET_CACHE.popitem(last=False)
+    return scaled
+
+# Discord のEmbed内では横幅に合わせて縮小されるため、縦横比を大きめにして見やすくする
+_STAGE_CARD_SIZE = (1000, 520)
+_STAGE_CARD_PAD = 20
+_STAGE_CARD_GAP = 16
+_STAGE_CARD_HEADER_H = 64
+_STAGE_CARD_ICON_SIZE = 40
+_STAGE_CARD_LABEL_H = 46
+_STAGE_CARD_PANEL_SIZE = (
+    (_STAGE_CARD_SIZE[0] - _STAGE_CARD_PAD * 2 - _STAGE_CARD_GAP) // 2,
+    _STAGE_CARD_SIZE[1] - _STAGE_CARD_HEADER_H - _STAGE_CARD_PAD * 2,
+)
+
+# ステージカードの固定部分 (背景+ルールアイコン, パネル, ラベル下地)。呼び出し側で書き換えないこと
+_STAGE_CARD_TEMPLATES: dict[tuple, object] = {}
+_STAGE_CARD_TEMPLATES_LOCK = threading.Lock()
+
+def _stage_card_template(key: tuple, build):
+    with _STAGE_CARD_TEMPLATES_LOCK:
+        cached = _STAGE_CARD_TEMPLATES.get(key)
+    if cached is not None:
+        return cached
+    built = build()
+    with _STAGE_CARD_TEMPLATES_LOCK:
+        return _STAGE_CARD_TEMPLATES.setdefault(key, built)
+
+def _build_stage_card_background(rule_icon_path: str | None):
+    from PIL import Image, ImageDraw  # type: ignore
+
+    card = Image.new("RGBA", _STAGE_CARD_SIZE, (25, 32, 44, 255))
+    draw = ImageDraw.Draw(card)
+
+    # header (rule icon)
+    icon_size = _STAGE_CARD_ICON_SIZE
+    icon_x = _STAGE_CARD_PAD
+    icon_y = _STAGE_CARD_PAD + 6
+
+    icon_img = _load_scaled_asset(rule_icon_path, (icon_size, icon_size), fit="stretch")
+
+    if icon_img:
+        # subtle shadow behind the icon for contrast
+        try:
+            from PIL import ImageFilter  # type: ignore
+
+            shadow = Image.new("RGBA", (icon_size, icon_size), (0, 0, 0, 0))
+            shadow.alpha_composite(icon_img)
+            shadow = shadow.filter(ImageFilter.GaussianBlur(radius=2))
+            card.alpha_composite(shadow, (icon_x + 1, icon_y + 2))
+        except Exception:
+            pass
         card.alpha_composite(icon_img, (icon_x, icon_y))
     else:
         badge_r = icon_size // 2
@@ -698,12 +1456,55 @@ def _render_stage_card_bytes(
         badge_cy = icon_y + badge_r
         badge_box = (badge_cx - badge_r, badge_cy - badge_r, badge_cx + badge_r, badge_cy + badge_r)
         draw.ellipse(badge_box, fill=(255, 196, 0, 255))
+    return card
+
+def _build_stage_card_panel():
+    from PIL import Image, ImageDraw  # type: ignore
+
+    w, h = _STAGE_CARD_PANEL_SIZE
+    panel = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    pdraw = ImageDraw.Draw(panel)
+    pdraw.rounded_rectangle((0, 0, w, h), radius=18, fill=(18, 24, 33, 255))
+    return panel
+
+def _build_stage_card_label():
+    from PIL import Image, ImageDraw  # type: ignore
+
+    w, label_h = _STAGE_CARD_PANEL_SIZE[0], _STAGE_CARD_LABEL_H
+    overlay = Image.new("RGBA", (w, label_h), (0, 0, 0, 0))
+    odraw = ImageDraw.Draw(overlay)
+    odraw.rounded_rectangle((0, 0, w, label_h), radius=12, fill=(0, 0, 0, 120))
+    return overlay
+
+def _render_stage_card_bytes(
+    rule_name: str,
+    rule_icon_path: str | None,
+    stage1_name: str,
+    stage1_path: str | None,
+    stage2_name: str,
+    stage2_path: str | None,
+) -> bytes | None:
+    try:
+        from PIL import ImageDraw  # type: ignore
+    except Exception:
+        return None
+
+    pad = _STAGE_CARD_PAD
+    background = _stage_card_template(
+        ("background", rule_icon_path, _asset_mtime_ns(rule_icon_path) if rule_icon_path else None),
+        lambda: _build_stage_card_background(rule_icon_path),
+    )
+    panel_base = _stage_card_template(("panel",), _build_stage_card_panel)
+    label_base = _stage_card_template(("label",), _build_stage_card_label)
 
-    title_font = load_font(30)
-    title_kanji_font = load_kanji_font(30)
-    draw_text_with_kanji_font(
+    card = background.copy()
+    draw = ImageDraw.Draw(card)
+
+    title_font = _load_font(30)
+    title_kanji_font = _load_kanji_font(30)
+    _draw_text_with_kanji_font(
         draw,
-        (icon_x + icon_size + 14, pad + 10),
+        (pad + _STAGE_CARD_ICON_SIZE + 14, pad + 10),
         rule_name,
         title_font,
         title_kanji_font,
@@ -711,66 +1512,35 @@ def _render_stage_card_bytes(
     )
 
     # stage panels
-    panel_top = pad + header_h
-    panel_h = card_h - panel_top - pad
-    panel_w = (card_w - pad * 2 - gap) // 2
-
-    def rounded_panel(x: int, y: int, w: int, h: int):
-        panel = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        pdraw = ImageDraw.Draw(panel)
-        pdraw.rounded_rectangle((0, 0, w, h), radius=corner_r, fill=(18, 24, 33, 255))
-        return panel
-
-    def paste_cover(target: Image.Image, img: Image.Image, box_xywh: tuple[int, int, int, int]):
-        x, y, w, h = box_xywh
-        iw, ih = img.size
-        scale = max(w / iw, h / ih)
-        nw, nh = int(iw * scale), int(ih * scale)
-        resized = img.resize((nw, nh), Image.Resampling.LANCZOS)
-        left = (nw - w) // 2
-        top = (nh - h) // 2
-        cropped = resized.crop((left, top, left + w, top + h))
-        target.alpha_composite(cropped, (x, y))
-
-    def draw_stage_label(x: int, y: int, w: int, h: int, text: str):
-        label_h = 46
-        overlay = Image.new("RGBA", (w, label_h), (0, 0, 0, 0))
-        odraw = ImageDraw.Draw(overlay)
-        odraw.rounded_rectangle((0, 0, w, label_h), radius=12, fill=(0, 0, 0, 120))
-        font = load_font(26)
-        kanji_font = load_kanji_font(26)
-        # center text
-        tw, th = measure_text(text, font, kanji_font)
-        draw_text_with_kanji_font(
-            odraw,
-            ((w - tw) // 2, (label_h - th) // 2 - 1),
-            text,
-            font,
-            kanji_font,
-            fill=(255, 255, 255, 255),
-        )
-        card.alpha_composite(overlay, (x, y + h - label_h - 8))
-
-    # Left stage
-    left_x = pad
-    right_x = pad + panel_w + gap
+    panel_top = pad + _STAGE_CARD_HEADER_H
+    panel_w, panel_h = _STAGE_CARD_PANEL_SIZE
+    label_h = _STAGE_CARD_LABEL_H
+    font = _load_font(26)
+    kanji_font = _load_kanji_font(26)
 
     for x, stage_name, stage_path in (
-        (left_x, stage1_name, stage1_path),
-        (right_x, stage2_name, stage2_path),
+        (pad, stage1_name, stage1_path),
+        (pad + panel_w + _STAGE_CARD_GAP, stage2_name, stage2_path),
     ):
-        panel = rounded_panel(0, 0, panel_w, panel_h)
-        if stage_path:
-            img = open_image(stage_path)
-            if img:
-                paste_cover(panel, img, (0, 0, panel_w, panel_h))
-        card.alpha_composite(panel, (x, panel_top))
+        img = _load_scaled_asset(stage_path, (panel_w, panel_h))
+        card.alpha_composite(panel_base, (x, panel_top))
+        if img:
+            card.alpha_composite(img, (x, panel_top))
         if stage_name and stage_name != "不明":
-            draw_stage_label(x, panel_top, panel_w, panel_h, stage_name)
+            label_y = panel_top + panel_h - label_h - 8
+            card.alpha_composite(label_base, (x, label_y))
+            # center text
+            tw, th = _measure_text(stage_name, font, kanji_font)
+            _draw_text_with_kanji_font(
+                draw,
+                (x + (panel_w - tw) // 2, label_y + (label_h - th) // 2 - 1),
+                stage_name,
+                font,
+                kanji_font,
+                fill=(255, 255, 255, 255),
+            )
 
-    out = io.BytesIO()
-    card.convert("RGB").save(out, format="PNG", optimize=True)
-    return out.getvalue()
+    return _encode_image(card, "stage")
 
 def _render_salmon_stage_with_weapons_bytes(stage_path: str | None, weapon_names: list[str]) -> bytes | None:
     try:
@@ -781,37 +1551,18 @@ def _render_salmon_stage_with_weapons_bytes(stage_path: str | None, weapon_names
     if not stage_path:
         return None
 
-    icon_paths = []
-    for name in weapon_names:
-        if name == "不明":
-            continue
-        if name == "ランダム":
-            icon_path = _find_weapon_image_by_name("ランダム")
-        else:
-            icon_path = _find_weapon_image_by_name(name)
-        if icon_path:
-            icon_paths.append(icon_path)
-
+    icon_paths = _salmon_weapon_icon_paths(weapon_names)
     if not icon_paths:
         return None
 
-    try:
-        stage_img = Image.open(stage_path).convert("RGBA")
-    except Exception:
-        return None
-
     target_w = 1000
     target_h = 520
-    canvas = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 255))
+    stage_img = _load_scaled_asset(stage_path, (target_w, target_h))
+    if stage_img is None:
+        return None
 
-    iw, ih = stage_img.size
-    scale = max(target_w / iw, target_h / ih)
-    nw, nh = int(iw * scale), int(ih * scale)
-    resized = stage_img.resize((nw, nh), Image.Resampling.LANCZOS)
-    left = (nw - target_w) // 2
-    top = (nh - target_h) // 2
-    cropped = resized.crop((left, top, left + target_w, top + target_h))
-    canvas.alpha_composite(cropped, (0, 0))
+    canvas = Image.new("RGBA", (target_w, target_h), (0, 0, 0, 255))
+    canvas.alpha_composite(stage_img, (0, 0))
 
     bar_h = 150
     overlay = Image.new("RGBA", (target_w, bar_h), (0, 0, 0, 166))
@@ -826,284 +1577,55 @@ def _render_salmon_stage_with_weapons_bytes(stage_path: str | None, weapon_names
     y = target_h - bar_h + (bar_h - icon_size) // 2
 
     for idx, path in enumerate(icons):
-        try:
-            icon = Image.open(path).convert("RGBA")
-        except Exception:
+        icon = _load_scaled_asset(path, (icon_size, icon_size), fit="contain")
+        if icon is None:
             continue
-        iw, ih = icon.size
-        scale = min(icon_size / iw, icon_size / ih)
-        nw, nh = int(iw * scale), int(ih * scale)
-        icon = icon.resize((nw, nh), Image.Resampling.LANCZOS)
+        nw, nh = icon.size
         x = start_x + idx * (icon_size + gap) + (icon_size - nw) // 2
         y2 = y + (icon_size - nh) // 2
         canvas.alpha_composite(icon, (x, y2))
 
-    out = io.BytesIO()
-    canvas.convert("RGB").save(out, format="PNG", optimize=True)
-    return out.getvalue()
-
-def _render_gear_collage_bytes(items: list[dict], title: str) -> bytes | None:
-    try:
-        from PIL import Image, ImageDraw, ImageFont  # type: ignore
-    except Exception:
-        return None
-
-    if not items:
-        return None
-
-    def load_font(size: int):
-        for candidate in (
-            FONT_PATH,
-            r"C:\Windows\Fonts\meiryo.ttc",
-            r"C:\Windows\Fonts\YuGothR.ttc",
-            r"C:\Windows\Fonts\msgothic.ttc",
-        ):
-            if os.path.exists(candidate):
-                try:
-                    return ImageFont.truetype(candidate, size=size)
-                except Exception:
-                    pass
-        return ImageFont.load_default()
-
-    def load_kanji_font(size: int):
-        if os.path.exists(KANJI_FONT_PATH):
-            try:
-                return ImageFont.truetype(KANJI_FONT_PATH, size=size)
-            except Exception:
-                pass
-        return load_font(size)
-
-    cols = 3
-    rows = (len(items) + cols - 1) // cols
-    card_w = 1000
-    card_h = 520
-    pad = 24
-    gap = 16
-    header_h = 60
-    cell_w = (card_w - pad * 2 - gap * (cols - 1)) // cols
-    cell_h = (card_h - pad * 2 - header_h - gap * (rows - 1)) // rows
-
-    bg = (20, 24, 34, 255)
-    card = Image.new("RGBA", (card_w, card_h), bg)
-    draw = ImageDraw.Draw(card)
-
-    def fetch_image(url: str) -> Image.Image | None:
-        try:
-            resp = requests.get(url, timeout=10)
-            if resp.status_code != 200:
-                return None
-            return Image.open(io.BytesIO(resp.content)).convert("RGBA")
-        except Exception:
-            return None
-
-    logo_cache: dict[str, Image.Image] = {}
-    nameplate_cache: dict[str, Image.Image] = {}
-    nameplate_paths = _nameplate_paths()
-
-    def fetch_logo(path: str) -> Image.Image | None:
-        if not path:
-            return None
-        cached = logo_cache.get(path)
-        if cached is not None:
-            return cached
-        try:
-            img = Image.open(path).convert("RGBA")
-        except Exception:
-            return None
-        logo_cache[path] = img
-        return img
-
-    def fetch_nameplate(path: str) -> Image.Image | None:
-        if not path:
-            return None
-        cached = nameplate_cache.get(path)
-        if cached is not None:
-            return cached
-        try:
-            img = Image.open(path).convert("RGBA")
-        except Exception:
-            return None
-        nameplate_cache[path] = img
-        return img
-
-    def is_kanji(ch: str) -> bool:
-        code = ord(ch)
-        return (
-            0x4E00 <= code <= 0x9FFF
-            or 0x3400 <= code <= 0x4DBF
-            or 0xF900 <= code <= 0xFAFF
-            or 0x20000 <= code <= 0x2A6DF
-            or 0x2A700 <= code <= 0x2B73F
-            or 0x2B740 <= code <= 0x2B81F
-            or 0x2B820 <= code <= 0x2CEAF
-        )
-
-    def _font_metrics(font) -> tuple[int, int]:
-        try:
-            return font.getmetrics()
-        except Exception:
-            return (0, 0)
-
-    def measure_text(text: str, base_font, kanji_font) -> tuple[int, int]:
-        total_w = 0
-        max_ascent = 0
-        max_descent = 0
-        tmp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            bbox = tmp_draw.textbbox((0, 0), ch, font=font)
-            total_w += bbox[2] - bbox[0]
-            ascent, descent = _font_metrics(font)
-            if ascent > max_ascent:
-                max_ascent = ascent
-            if descent > max_descent:
-                max_descent = descent
-        return total_w, max_ascent + max_descent
-
-    def draw_text_with_kanji_font(draw, pos: tuple[int, int], text: str, base_font, kanji_font, **kwargs):
-        x, y = pos
-        base_ascent, _ = _font_metrics(base_font)
-        kanji_ascent, _ = _font_metrics(kanji_font)
-        max_ascent = max(base_ascent, kanji_ascent)
-        for ch in text:
-            font = kanji_font if is_kanji(ch) else base_font
-            ascent, _ = _font_metrics(font)
-            draw.text((x, y + (max_ascent - ascent)), ch, font=font, **kwargs)
-            bbox = draw.textbbox((0, 0), ch, font=font)
-            x += bbox[2] - bbox[0]
-
-    title_font = load_font(28)
-    title_kanji_font = load_kanji_font(28)
-    draw_text_with_kanji_font(
-        draw,
-        (pad, pad + 6),
-        title,
-        title_font,
-        title_kanji_font,
-        fill=(255, 255, 255, 255),
-    )
-
-    def paste_cover(target: Image.Image, img: Image.Image, x: int, y: int, w: int, h: int):
-        iw, ih = img.size
-        scale = max(w / iw, h / ih)
-        nw, nh = int(iw * scale), int(ih * scale)
-        resized = img.resize((nw, nh), Image.Resampling.LANCZOS)
-        left = (nw - w) // 2
-        top = (nh - h) // 2
-        cropped = resized.crop((left, top, left + w, top + h))
-        target.alpha_composite(cropped, (x, y))
-
-    def paste_logo(target: Image.Image, logo: Image.Image, pad_px: int = 10):
-        tw, th = target.size
-        lw, lh = logo.size
-        max_size = int(min(tw, th) * 0.22)
-        if max_size <= 0:
-            return
-        scale = min(max_size / lw, max_size / lh)
-        nw, nh = max(1, int(lw * scale)), max(1, int(lh * scale))
-        resized = logo.resize((nw, nh), Image.Resampling.LANCZOS)
-        target.alpha_composite(resized, (tw - nw - pad_px, pad_px))
-
-    label_font_size = 20
-    label_font = load_font(label_font_size)
-    label_h = 34
-
-    for idx, item in enumerate(items):
-        row = idx // cols
-        col = idx % cols
-        x = pad + col * (cell_w + gap)
-        y = pad + header_h + row * (cell_h + gap)
-
-        label_h_eff = label_h
-        plate_x = 0
-        plate_y = cell_h - label_h
-        plate_w = cell_w
-        plate_h = label_h
-        plate_img = None
-        if nameplate_paths:
-            plate_path = random.choice(nameplate_paths)
-            plate = fetch_nameplate(plate_path)
-            if plate:
-                plate_w, plate_h = plate.size
-                scale = min(cell_w / plate_w, cell_h / plate_h, 1.0)
-                if scale < 1.0:
-                    plate = plate.resize(
-                        (max(1, int(plate_w * scale)), max(1, int(plate_h * scale))),
-                        Image.Resampling.LANCZOS,
-                    )
-                    plate_w, plate_h = plate.size
-                plate_x = (cell_w - plate_w) // 2
-                plate_y = cell_h - plate_h
-                plate_img = plate
-        if plate_img is not None:
-            label_h_eff = plate_h
-        else:
-            label_h_eff = label_h
-            plate_w = cell_w
-            plate_h = label_h
-        image_h = max(1, cell_h - label_h_eff)
-        label_y = image_h
-
-        panel = Image.new("RGBA", (cell_w, cell_h), (10, 12, 18, 255))
-        img = fetch_image(item.get("image_url") or "")
-        if img:
-            paste_cover(panel, img, 0, 0, cell_w, image_h)
-        logo_path = item.get("brand_logo_path") or ""
-        if logo_path:
-            logo = fetch_logo(logo_path)
-            if logo:
-                paste_logo(panel, logo)
+    return _encode_image(canvas, "salmon")
 
-        if plate_img is not None:
-            panel.paste(plate_img, (plate_x, label_y), plate_img)
-        else:
-            overlay = Image.new("RGBA", (cell_w, label_h), (0, 0, 0, 160))
-            panel.alpha_composite(overlay, (plate_x, label_y))
-        odraw = ImageDraw.Draw(panel)
-        name = item.get("name") or "不明"
-        max_w = max(10, plate_w - 12)
-        font = label_font
-        kanji_font = load_kanji_font(label_font_size)
-        for size in range(label_font_size, 11, -2):
-            font = load_font(size)
-            kanji_font = load_kanji_font(size)
-            tw, _ = measure_text(name, font, kanji_font)
-            if tw <= max_w:
-                break
-        else:
-            tw = max_w + 1
-        if tw > max_w:
-            truncated = name
-            while truncated:
-                truncated = truncated[:-1]
-                test = f"{truncated}..."
-                tw, _ = measure_text(test, font, kanji_font)
-                if tw <= max_w:
-                    name = test
-                    break
-        tw, th = measure_text(name, font, kanji_font)
-        text_x = plate_x + (plate_w - tw) // 2
-        text_y = label_y + (label_h_eff - th) // 2 - 1
-        draw_text_with_kanji_font(
-            odraw,
-            (text_x, text_y),
-            name,
-            font,
-            kanji_font,
-            fill=(20, 20, 20, 255),
-            stroke_width=2,
-            stroke_fill=(255, 255, 255, 220),
-        )
+_GEAR_COLLAGE_WIDTH = 1000
+_GEAR_COLLAGE_COLS = 3
+_GEAR_COLLAGE_PAD = 24
+_GEAR_COLLAGE_GAP = 16
+_GEAR_COLLAGE_SECTION_GAP = 28
+_GEAR_COLLAGE_HEADER_H = 60
+_GEAR_COLLAGE_CELL_H = 198
+_GEAR_COLLAGE_LABEL_H = 34
 
-        card.alpha_composite(panel, (x, y))
 
-    out = io.BytesIO()
-    card.convert("RGB").save(out, format="PNG", optimize=True)
-    return out.getvalue()
+@functools.lru_cache(maxsize=32)
+def _gear_collage_layout(counts: tuple[int, ...]) -> tuple[tuple[int, int], tuple[int, int], tuple[tuple[int, tuple[tuple[int, int], ...]], ...]]:
+    """セクションごとのアイテム数から (画像サイズ, セルサイズ, [(見出しの y, セル座標...)]) を求める"""
+    pad = _GEAR_COLLAGE_PAD
+    gap = _GEAR_COLLAGE_GAP
+    cols = _GEAR_COLLAGE_COLS
+    cell_w = (_GEAR_COLLAGE_WIDTH - pad * 2 - gap * (cols - 1)) // cols
+    cell_h = _GEAR_COLLAGE_CELL_H
 
-def _render_gear_collage_sections_bytes(sections: list[tuple[str, list[dict]]]) -> bytes | None:
+    sections = []
+    y_cursor = pad
+    for count in counts:
+        header_y = y_cursor
+        y_cursor += _GEAR_COLLAGE_HEADER_H
+        cells = []
+        for idx in range(count):
+            row, col = divmod(idx, cols)
+            cells.append((pad + col * (cell_w + gap), y_cursor + row * (cell_h + gap)))
+        rows = (count + cols - 1) // cols
+        y_cursor += rows * (cell_h + gap) - gap + _GEAR_COLLAGE_SECTION_GAP
+        sections.append((header_y, tuple(cells)))
+    card_h = y_cursor - _GEAR_COLLAGE_SECTION_GAP + pad
+    return (_GEAR_COLLAGE_WIDTH, card_h), (cell_w, cell_h), tuple(sections)
+
+
+def _render_gear_collage_bytes(sections: list[tuple[str, list[dict]]]) -> bytes | None:
+    """(見出し, ギア一覧) のセクションを縦に並べたコラージュ画像を1枚描く"""
     try:
-        from PIL import Image, ImageDraw, ImageFont  # type: ignore
+        from PIL import Image, ImageDraw  # type: ignore
     except Exception:
         return None
 
@@ -1111,173 +1633,65 @@ def _render_gear_collage_sections_bytes(sections: list[tuple[str, list[dict]]])
     if not sections:
         return None
 
-    def load_font(size: int):
-        for candidate in (
-            FONT_PATH,
-            r"C:\Windows\Fonts\meiryo.ttc",
-            r"C:\Windows\Fonts\YuGothR.ttc",
-            r"C:\Windows\Fonts\msgothic.ttc",
-        ):
-            if os.path.exists(candidate):
-                try:
-                    return ImageFont.truetype(candidate, size=size)
-                except Exception:
-                    pass
-        return ImageFont.load_default()
-
-    def fetch_image(url: str) -> Image.Image | None:
-        try:
-            resp = requests.get(url, timeout=10)
-            if resp.status_code != 200:
-                return None
-            return Image.open(io.BytesIO(resp.content)).convert("RGBA")
-        except Exception:
-            return None
-
-    logo_cache: dict[str, Image.Image] = {}
-    nameplate_cache: dict[str, Image.Image] = {}
+    card_size, (cell_w, cell_h), layout = _gear_collage_layout(tuple(len(items) for _, items in sections))
+    card = Image.new("RGBA", card_size, (20, 24, 34, 255))
+    draw = ImageDraw.Draw(card)
     nameplate_paths = _nameplate_paths()
 
-    def fetch_logo(path: str) -> Image.Image | None:
-        if not path:
-            return None
-        cached = logo_cache.get(path)
-        if cached is not None:
-            return cached
-        try:
-            img = Image.open(path).convert("RGBA")
-        except Exception:
-            return None
-        logo_cache[path] = img
-        return img
-
-    def fetch_nameplate(path: str) -> Image.Image | None:
-        if not path:
-            return None
-        cached = nameplate_cache.get(path)
-        if cached is not None:
-            return cached
-        try:
-            img = Image.open(path).convert("RGBA")
-        except Exception:
-            return None
-        nameplate_cache[path] = img
-        return img
-
-    def paste_cover(target: Image.Image, img: Image.Image, x: int, y: int, w: int, h: int):
-        iw, ih = img.size
-        scale = max(w / iw, h / ih)
-        nw, nh = int(iw * scale), int(ih * scale)
-        resized = img.resize((nw, nh), Image.Resampling.LANCZOS)
-        left = (nw - w) // 2
-        top = (nh - h) // 2
-        cropped = resized.crop((left, top, left + w, top + h))
-        target.alpha_composite(cropped, (x, y))
-
-    def paste_logo(target: Image.Image, logo: Image.Image, pad_px: int = 10):
-        tw, th = target.size
-        lw, lh = logo.size
-        max_size = int(min(tw, th) * 0.22)
-        if max_size <= 0:
-            return
-        scale = min(max_size / lw, max_size / lh)
-        nw, nh = max(1, int(lw * scale)), max(1, int(lh * scale))
-        resized = logo.resize((nw, nh), Image.Resampling.LANCZOS)
-        target.alpha_composite(resized, (tw - nw - pad_px, pad_px))
-
-    card_w = 1000
-    card_h = 900
-    pad = 24
-    gap = 16
-    section_gap = 28
-    header_h = 46
-    cols = 3
-
-    bg = (20, 24, 34, 255)
-    card = Image.new("RGBA", (card_w, card_h), bg)
-    draw = ImageDraw.Draw(card)
-    title_font = load_font(26)
-    title_kanji_font = load_kanji_font(26)
+    title_font = _load_font(28)
+    title_kanji_font = _load_kanji_font(28)
     label_font_size = 20
-    label_font = load_font(label_font_size)
-    label_h = 34
-
-    y_cursor = pad
-    for title, items in sections:
-        draw_text_with_kanji_font(
+    label_h = _GEAR_COLLAGE_LABEL_H
+    logo_size = int(min(cell_w, cell_h) * 0.22)
+    logo_pad = 10
+    panel_base = Image.new("RGBA", (cell_w, cell_h), (10, 12, 18, 255))
+    label_overlay = Image.new("RGBA", (cell_w, label_h), (0, 0, 0, 160))
+
+    for (title, items), (header_y, cells) in zip(sections, layout):
+        _draw_text_with_kanji_font(
             draw,
-            (pad, y_cursor + 2),
+            (_GEAR_COLLAGE_PAD, header_y + 6),
             title,
             title_font,
             title_kanji_font,
             fill=(255, 255, 255, 255),
         )
-        y_cursor += header_h
-
-        rows = (len(items) + cols - 1) // cols
-        cell_w = (card_w - pad * 2 - gap * (cols - 1)) // cols
-        cell_h = 220
-
-        for idx, item in enumerate(items):
-            row = idx // cols
-            col = idx % cols
-            x = pad + col * (cell_w + gap)
-            y = y_cursor + row * (cell_h + gap)
-
-            label_h_eff = label_h
-            plate_x = 0
-            plate_y = cell_h - label_h
-            plate_w = cell_w
-            plate_h = label_h
+
+        for item, (x, y) in zip(items, cells):
             plate_img = None
             if nameplate_paths:
-                plate_path = random.choice(nameplate_paths)
-                plate = fetch_nameplate(plate_path)
-                if plate:
-                    plate_w, plate_h = plate.size
-                    scale = min(cell_w / plate_w, cell_h / plate_h, 1.0)
-                    if scale < 1.0:
-                        plate = plate.resize(
-                            (max(1, int(plate_w * scale)), max(1, int(plate_h * scale))),
-                            Image.Resampling.LANCZOS,
-                        )
-                        plate_w, plate_h = plate.size
-                    plate_x = (cell_w - plate_w) // 2
-                    plate_y = cell_h - plate_h
-                    plate_img = plate
+                plate_img = _load_scaled_asset(random.choice(nameplate_paths), (cell_w, cell_h), "shrink")
             if plate_img is not None:
-                label_h_eff = plate_h
+                plate_w, plate_h = plate_img.size
+                plate_x = (cell_w - plate_w) // 2
             else:
-                label_h_eff = label_h
-                plate_w = cell_w
-                plate_h = label_h
+                plate_w, plate_h = cell_w, label_h
+                plate_x = 0
+            label_h_eff = plate_h
             image_h = max(1, cell_h - label_h_eff)
             label_y = image_h
 
-            panel = Image.new("RGBA", (cell_w, cell_h), (10, 12, 18, 255))
-            img = fetch_image(item.get("image_url") or "")
+            panel = panel_base.copy()
+            img = _load_scaled_asset(item.get("image_path"), (cell_w, image_h), "cover")
             if img:
-                paste_cover(panel, img, 0, 0, cell_w, image_h)
-            logo_path = item.get("brand_logo_path") or ""
-            if logo_path:
-                logo = fetch_logo(logo_path)
-                if logo:
-                    paste_logo(panel, logo)
+                panel.alpha_composite(img, (0, 0))
+            logo = _load_scaled_asset(item.get("brand_logo_path"), (logo_size, logo_size), "contain") if logo_size > 0 else None
+            if logo:
+                panel.alpha_composite(logo, (cell_w - logo.size[0] - logo_pad, logo_pad))
 
             if plate_img is not None:
-                panel.paste(plate_img, (plate_x, label_y), plate_img)
+                panel.alpha_composite(plate_img, (plate_x, label_y))
             else:
-                overlay = Image.new("RGBA", (cell_w, label_h), (0, 0, 0, 160))
-                panel.alpha_composite(overlay, (plate_x, label_y))
+                panel.alpha_composite(label_overlay, (plate_x, label_y))
             odraw = ImageDraw.Draw(panel)
             name = item.get("name") or "不明"
             max_w = max(10, plate_w - 12)
-            font = label_font
-            kanji_font = load_kanji_font(label_font_size)
+            font = _load_font(label_font_size)
+            kanji_font = _load_kanji_font(label_font_size)
             for size in range(label_font_size, 11, -2):
-                font = load_font(size)
-                kanji_font = load_kanji_font(size)
-                tw, _ = measure_text(name, font, kanji_font)
+                font = _load_font(size)
+                kanji_font = _load_kanji_font(size)
+                tw, _ = _measure_text(name, font, kanji_font)
                 if tw <= max_w:
                     break
             else:
@@ -1287,14 +1701,14 @@ def _render_gear_collage_sections_bytes(sections: list[tuple[str, list[dict]]])
                 while truncated:
                     truncated = truncated[:-1]
                     test = f"{truncated}..."
-                    tw, _ = measure_text(test, font, kanji_font)
+                    tw, _ = _measure_text(test, font, kanji_font)
                     if tw <= max_w:
                         name = test
                         break
-            tw, th = measure_text(name, font, kanji_font)
+            tw, th = _measure_text(name, font, kanji_font)
             text_x = plate_x + (plate_w - tw) // 2
             text_y = label_y + (label_h_eff - th) // 2 - 1
-            draw_text_with_kanji_font(
+            _draw_text_with_kanji_font(
                 odraw,
                 (text_x, text_y),
                 name,
@@ -1307,13 +1721,9 @@ def _render_gear_collage_sections_bytes(sections: list[tuple[str, list[dict]]])
 
             card.alpha_composite(panel, (x, y))
 
-        y_cursor += rows * (cell_h + gap) - gap + section_gap
+    return _encode_image(card, "gear")
 
-    out = io.BytesIO()
-    card.convert("RGB").save(out, format="PNG", optimize=True)
-    return out.getvalue()
-
-def _build_mode_embeds(result: dict, schedule_index: int, title_prefix: str) -> tuple[list[discord.Embed], list[discord.File]]:
+async def _build_mode_embeds(result: dict, schedule_index: int, title_prefix: str) -> tuple[list[discord.Embed], list[discord.File]]:
     # 取得したいモードのリスト
     modes = {
         "regular": "ナワバリバトル",
@@ -1331,6 +1741,7 @@ def _build_mode_embeds(result: dict, schedule_index: int, title_prefix: str) ->
 
     embeds: list[discord.Embed] = []
     files_by_name: dict[str, discord.File] = {}
+    card_jobs: list[tuple[discord.Embed, str | None, asyncio.Future]] = []
 
     for key, name in modes.items():
         color = mode_colors.get(key, 0x19FF19)
@@ -1367,16 +1778,24 @@ def _build_mode_embeds(result: dict, schedule_index: int, title_prefix: str) ->
         stage2_path = _find_local_image_by_name(stage2_name)
         rule_icon_path = _find_local_rule_icon(rule)
 
-        card_bytes = _render_stage_card_bytes(
-            rule_name=rule,
-            rule_icon_path=rule_icon_path,
-            stage1_name=stage1_name,
-            stage1_path=stage1_path,
-            stage2_name=stage2_name,
-            stage2_path=stage2_path,
+        # 4モード分のカードは描画プールで並行して描く
+        render = asyncio.ensure_future(
+            _render_stage_card_cached(
+                rule_name=rule,
+                rule_icon_path=rule_icon_path,
+                stage1_name=stage1_name,
+                stage1_path=stage1_path,
+                stage2_name=stage2_name,
+                stage2_path=stage2_path,
+            )
         )
+        card_jobs.append((embed, stage1_path, render))
+        embeds.append(embed)
+
+    for embed, stage1_path, render in card_jobs:
+        card_bytes = await render
         if card_bytes:
-            filename = f"card_{hashlib.md5(card_bytes).hexdigest()}.png"
+            filename = f"card_{hashlib.md5(card_bytes).hexdigest()}{_image_extension('stage')}"
             embed.set_image(url=f"attachment://{filename}")
             if filename not in files_by_name:
                 files_by_name[filename] = discord.File(fp=io.BytesIO(card_bytes), filename=filename)
@@ -1388,32 +1807,66 @@ def _build_mode_embeds(result: dict, schedule_index: int, title_prefix: str) ->
                 if filename not in files_by_name:
                     files_by_name[filename] = discord.File(stage1_path, filename=filename)
 
-        embeds.append(embed)
-
     return embeds, list(files_by_name.values())
 
-def _get_stage_payload(schedule_index: int, title_prefix: str) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
-    data = get_stages()
+async def _get_stage_payload(schedule_index: int, title_prefix: str) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+    data = await get_stages()
     if not data:
         return None, None, "データの取得に失敗しました。"
 
     res = data.get("result", {})
-    embeds, files = _build_mode_embeds(res, schedule_index=schedule_index, title_prefix=title_prefix)
+    embeds, files = await _build_mode_embeds(res, schedule_index=schedule_index, title_prefix=title_prefix)
     return embeds, files, None
 
-def _get_stage_rotation_key(data: dict) -> str | None:
+def _stage_schedule_index(res: dict, at: datetime | None = None) -> int | None:
+    """at の時点のローテーションが result の何番目かを返す (at を省略すると先頭)"""
+    regular = res.get("regular") or []
+    if not regular:
+        return None
+    if at is None:
+        return 0
+    for idx, item in enumerate(regular):
+        try:
+            if _parse_iso_datetime(item["start_time"]) <= at < _parse_iso_datetime(item["end_time"]):
+                return idx
+        except Exception:
+            continue
+    return None
+
+def _get_stage_rotation_key(data: dict, at: datetime | None = None) -> str | None:
     try:
         res = data.get("result", {})
-        regular = res.get("regular", [])
-        if not regular:
+        index = _stage_schedule_index(res, at)
+        if index is None:
             return None
-        cur = regular[0]
-        return cur.get("start_time")
+        return res["regular"][index].get("start_time")
     except Exception:
         return None
 
-def _find_current_item(results: list[dict]) -> dict | None:
-    now = datetime.now().astimezone()
+async def _build_stage_payload_at(
+    data: dict, at: datetime, title_prefix: str
+) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+    res = data.get("result", {})
+    index = _stage_schedule_index(res, at)
+    if index is None:
+        return None, None, "ステージ情報がありません。"
+    embeds, files = await _build_mode_embeds(res, schedule_index=index, title_prefix=title_prefix)
+    return embeds, files, None
+
+def _find_next_item(results: list[dict], at: datetime) -> dict | None:
+    """at より後に始まる最初の枠を返す"""
+    upcoming: tuple[datetime, dict] | None = None
+    for item in results:
+        try:
+            start_time = _parse_iso_datetime(item.get("start_time") or item.get("startTime") or "")
+        except Exception:
+            continue
+        if start_time > at and (upcoming is None or start_time < upcoming[0]):
+            upcoming = (start_time, item)
+    return upcoming[1] if upcoming else None
+
+def _find_current_item(results: list[dict], at: datetime | None = None) -> dict | None:
+    now = at or datetime.now().astimezone()
     for item in results:
         try:
             start_raw = item.get("start_time") or item.get("startTime") or ""
@@ -1426,14 +1879,18 @@ def _find_current_item(results: list[dict]) -> dict | None:
             return item
     return None
 
-def _load_locale() -> dict:
+async def _ensure_locale() -> dict:
+    # ロケールはギア名の変換で同期的に参照されるため、使う前にここで取得しておく
     global _LOCALE_CACHE
-    if _LOCALE_CACHE is not None:
+    if _LOCALE_CACHE:
         return _LOCALE_CACHE
-    data = get_locale_data()
+    data = await get_locale_data()
     _LOCALE_CACHE = data or {}
     return _LOCALE_CACHE
 
+def _load_locale() -> dict:
+    return _LOCALE_CACHE or {}
+
 def _locale_name(category: str, key: str | None) -> str | None:
     if not key:
         return None
@@ -1461,35 +1918,78 @@ def _localized_brand_name(brand: dict) -> str:
 
 
 def _find_brand_logo_path(brand: dict) -> str | None:
-    base_dir = os.path.join(os.path.dirname(__file__), "img", "ギアブランド")
     name = _localized_brand_name(brand)
-    if name:
-        candidate = os.path.join(base_dir, f"{name}.png")
-        if os.path.exists(candidate):
-            return candidate
+    candidate = _find_asset(BRAND_LOGO_DIR, name, (".png",))
+    if candidate:
+        return candidate
     raw_name = brand.get("name")
     if raw_name and raw_name != name:
-        candidate = os.path.join(base_dir, f"{raw_name}.png")
-        if os.path.exists(candidate):
-            return candidate
+        return _find_asset(BRAND_LOGO_DIR, raw_name, (".png",))
     return None
 
-def _get_current_fest_record(data: dict) -> dict | None:
+def _fest_records(data: dict) -> list[dict]:
+    region = data.get("JP") or {}
+    return region.get("data", {}).get("festRecords", {}).get("nodes", [])
+
+def _get_current_fest_record(data: dict, at: datetime | None = None) -> dict | None:
     if not data:
         return None
-    region = data.get("JP") or {}
-    records = region.get("data", {}).get("festRecords", {}).get("nodes", [])
-    current = _find_current_item(records)
-    return current
+    return _find_current_item(_fest_records(data), at)
 
 
-def _is_fest_active() -> bool:
-    data = get_festivals_data()
-    current = _get_current_fest_record(data or {})
-    return current is not None
+# 開催中または次回のフェスの期間 {"start": epoch秒|None, "end": epoch秒|None, "valid_until": epoch秒}
+_FEST_WINDOW: dict | None = None
+_FEST_WINDOW_LOCK = asyncio.Lock()
 
-def _get_salmon_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
-    data = get_salmon_schedule()
+def _compute_fest_window(data: dict, now_ts: float) -> dict:
+    region = data.get("JP") or {}
+    records = region.get("data", {}).get("festRecords", {}).get("nodes", [])
+    best: tuple[float, float] | None = None
+    for record in records:
+        try:
+            start_ts = _parse_iso_datetime(record.get("startTime") or "").timestamp()
+            end_ts = _parse_iso_datetime(record.get("endTime") or "").timestamp()
+        except Exception:
+            continue
+        if end_ts <= now_ts:
+            continue
+        if best is None or start_ts < best[0]:
+            best = (start_ts, end_ts)
+
+    valid_until = now_ts + FEST_STATE_TTL_SECONDS
+    if best is None:
+        return {"start": None, "end": None, "valid_until": valid_until}
+    # 期間が終わったら次のフェスを探し直す
+    return {"start": best[0], "end": best[1], "valid_until": min(valid_until, best[1])}
+
+async def _get_fest_window(now_ts: float) -> dict:
+    global _FEST_WINDOW
+    window = _FEST_WINDOW
+    if window is not None and now_ts < window["valid_until"]:
+        return window
+
+    async with _FEST_WINDOW_LOCK:
+        window = _FEST_WINDOW
+        if window is not None and now_ts < window["valid_until"]:
+            return window
+        data = await get_festivals_data()
+        if data:
+            window = _compute_fest_window(data, now_ts)
+        elif window is not None:
+            window = dict(window, valid_until=now_ts + SCHEDULE_CACHE_ERROR_RETRY_SECONDS)
+        else:
+            window = {"start": None, "end": None, "valid_until": now_ts + SCHEDULE_CACHE_ERROR_RETRY_SECONDS}
+        _FEST_WINDOW = window
+        return window
+
+async def _is_fest_active(now: datetime | None = None) -> bool:
+    now_ts = (now or datetime.now().astimezone()).timestamp()
+    window = await _get_fest_window(now_ts)
+    start_ts = window["start"]
+    return start_ts is not None and start_ts <= now_ts < window["end"]
+
+async def _get_salmon_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
+    data = await get_salmon_schedule()
     if not data:
         return None, None, "データの取得に失敗しました。"
 
@@ -1497,9 +1997,9 @@ def _get_salmon_payload() -> tuple[discord.Embed | None, list[discord.File] | No
     if not results:
         return None, None, "サーモンランの情報がありません。"
 
-    return _build_salmon_payload_from_item(results[0])
+    return await _build_salmon_payload_from_item(results[0])
 
-def _build_salmon_payload_from_item(item: dict) -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
+async def _build_salmon_payload_from_item(item: dict) -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
     current = item
     stage = current.get("stage") or {}
     boss = current.get("boss") or {}
@@ -1530,9 +2030,9 @@ def _build_salmon_payload_from_item(item: dict) -> tuple[discord.Embed | None, l
     files_by_name: dict[str, discord.File] = {}
 
     stage_path = _find_local_image_by_name(stage_name)
-    salmon_card = _render_salmon_stage_with_weapons_bytes(stage_path, weapon_names)
+    salmon_card = await _render_salmon_card_cached(stage_path, weapon_names)
     if salmon_card:
-        filename = f"salmon_{hashlib.md5(salmon_card).hexdigest()}.png"
+        filename = f"salmon_{hashlib.md5(salmon_card).hexdigest()}{_image_extension('salmon')}"
         embed.set_image(url=f"attachment://{filename}")
         files_by_name[filename] = discord.File(fp=io.BytesIO(salmon_card), filename=filename)
     elif stage_path:
@@ -1565,34 +2065,683 @@ def _build_salmon_payload_from_item(item: dict) -> tuple[discord.Embed | None, l
 
     return embed, list(files_by_name.values()), None
 
-async def _send_ephemeral_payloads(
-    interaction: discord.Interaction,
-    payloads: list[tuple[list[discord.Embed] | None, list[discord.File] | None]],
-) -> None:
-    first = True
-    use_followup_only = interaction.response.is_done()
-    for embeds, files in payloads:
-        if not embeds:
-            continue
-        if first and not use_followup_only:
-            await interaction.response.send_message(embeds=embeds, files=files, ephemeral=True)
-            first = False
-        else:
-            await interaction.followup.send(embeds=embeds, files=files, ephemeral=True)
+# 添付ファイル名 -> (Discord の CDN URL, 失効時刻, 元のメッセージ (channel_id, message_id))。
+# ファイル名は内容ごとに変わるので名前で引ける
+_ATTACHMENT_URL_CACHE: dict[str, tuple[str, float, tuple[int, int]]] = {}
+# 元のメッセージ -> そこから覚えた添付ファイル名 (削除・編集されたらまとめて捨てる)
+_ATTACHMENT_URL_SOURCES: dict[tuple[int, int], set[str]] = {}
+# 実行中の後処理タスク (途中で GC されないよう参照を持っておく)
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+def _spawn_background(coro) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+def _attachment_url_expiry(url: str, now_ts: float) -> float:
+    # 署名付き URL はクエリの ex (16進数の UNIX 時刻) で失効する。余裕を持って手前で捨てる
+    try:
+        ex = parse_qs(urlparse(url).query).get("ex")
+        if ex:
+            return int(ex[0], 16) - ATTACHMENT_URL_EXPIRY_MARGIN_SECONDS
+    except Exception:
+        pass
+    return now_ts + ATTACHMENT_URL_FALLBACK_TTL_SECONDS
 
-async def _send_ephemeral_text(interaction: discord.Interaction, text: str) -> None:
-    if interaction.response.is_done():
-        await interaction.followup.send(text, ephemeral=True)
+def _attachment_source(message) -> tuple[int, int] | None:
+    channel_id = getattr(getattr(message, "channel", None), "id", None) or getattr(message, "channel_id", None)
+    message_id = getattr(message, "id", None)
+    if not channel_id or not message_id:
+        return None
+    return int(channel_id), int(message_id)
+
+def _drop_cached_attachment_url(filename: str) -> None:
+    entry = _ATTACHMENT_URL_CACHE.pop(filename, None)
+    if entry is None:
+        return
+    names = _ATTACHMENT_URL_SOURCES.get(entry[2])
+    if names is not None:
+        names.discard(filename)
+        if not names:
+            _ATTACHMENT_URL_SOURCES.pop(entry[2], None)
+
+def _remember_attachment_urls(message) -> None:
+    """送ったメッセージの添付 URL を覚える。Bot が消す予定のメッセージやエフェメラルには使わないこと"""
+    if not ATTACHMENT_URL_CACHE_ENABLED or message is None:
+        return
+    flags = getattr(message, "flags", None)
+    if flags is not None and getattr(flags, "ephemeral", False):
+        return
+    source = _attachment_source(message)
+    if source is None:
+        return
+    now_ts = time.time()
+    for attachment in getattr(message, "attachments", None) or []:
+        _drop_cached_attachment_url(attachment.filename)
+        _ATTACHMENT_URL_CACHE[attachment.filename] = (
+            attachment.url,
+            _attachment_url_expiry(attachment.url, now_ts),
+            source,
+        )
+        _ATTACHMENT_URL_SOURCES.setdefault(source, set()).add(attachment.filename)
+
+def _forget_attachment_urls(channel_id: int, message_id: int | None = None) -> None:
+    """メッセージ (message_id が None ならチャンネル全体) から覚えた添付 URL を捨てる"""
+    if message_id is not None:
+        sources = [(int(channel_id), int(message_id))]
     else:
-        await interaction.response.send_message(text, ephemeral=True)
+        sources = [source for source in _ATTACHMENT_URL_SOURCES if source[0] == int(channel_id)]
+    for source in sources:
+        for filename in list(_ATTACHMENT_URL_SOURCES.get(source, ())):
+            _drop_cached_attachment_url(filename)
+
+def _cached_attachment_url(filename: str) -> str | None:
+    entry = _ATTACHMENT_URL_CACHE.get(filename)
+    if entry is None:
+        return None
+    url, expires_at, _ = entry
+    if expires_at <= time.time():
+        _drop_cached_attachment_url(filename)
+        return None
+    return url
+
+def _reuse_cached_attachments(embeds: list[discord.Embed], files: list[discord.File]) -> list[discord.File]:
+    """送信済みの添付は CDN URL の参照に差し替え、まだアップロードが必要なファイルだけを返す"""
+    if not ATTACHMENT_URL_CACHE_ENABLED or not files or not embeds:
+        return files
+    remaining: list[discord.File] = []
+    for file in files:
+        url = _cached_attachment_url(file.filename)
+        ref = f"attachment://{file.filename}"
+        referenced = False
+        if url:
+            for embed in embeds:
+                if embed.image.url == ref:
+                    embed.set_image(url=url)
+                    referenced = True
+                if embed.thumbnail.url == ref:
+                    embed.set_thumbnail(url=url)
+                    referenced = True
+                if embed.author.icon_url == ref:
+                    embed.set_author(name=embed.author.name, url=embed.author.url, icon_url=url)
+                    referenced = True
+                if embed.footer.icon_url == ref:
+                    embed.set_footer(text=embed.footer.text, icon_url=url)
+                    referenced = True
+        if referenced:
+            file.close()
+        else:
+            remaining.append(file)
+    return remaining
 
-def _get_current_event_item(data: dict) -> dict | None:
-    results = data.get("results") or []
-    return _find_current_item(results)
+async def _remember_original_response_attachments(interaction: discord.Interaction) -> None:
+    try:
+        _remember_attachment_urls(await interaction.original_response())
+    except Exception as e:
+        print(f"Error fetching original response: {e}")
+
+async def _send_with_attachment_cache(
+    send, *, embeds=None, embed=None, files=None, interaction=None, remember=True, reuse=True, **kwargs
+):
+    """send(...) で Embed を送る。URL が分かっている添付は再アップロードせず、送った添付の URL は覚えておく
+
+    後で Bot が消すメッセージやエフェメラルのメッセージは remember=False 扱いにし、URL の元にしない。
+    reuse=False なら、キャッシュ済みの URL があってもすべてアップロードする。
+    """
+    remember = remember and not kwargs.get("ephemeral")
+    embed_list = embeds if embeds is not None else ([embed] if embed is not None else [])
+    files = _reuse_cached_attachments(embed_list, list(files or [])) if reuse else list(files or [])
+    if embeds is not None:
+        kwargs["embeds"] = embeds
+    if embed is not None:
+        kwargs["embed"] = embed
+    if files:
+        kwargs["files"] = files
+    result = await send(**kwargs)
+    # interaction.response.send_message は Message を返さないことがあるので、必要なら後から取りに行く
+    message = getattr(result, "resource", result)
+    if not remember:
+        pass
+    elif isinstance(message, discord.Message):
+        _remember_attachment_urls(message)
+    elif files and interaction is not None and ATTACHMENT_URL_CACHE_ENABLED:
+        _spawn_background(_remember_original_response_attachments(interaction))
+    return message if isinstance(message, discord.Message) else result
+
+# Discord の1メッセージあたりの上限
+DISCORD_MAX_EMBEDS_PER_MESSAGE = 10
+DISCORD_MAX_FILES_PER_MESSAGE = 10
+DISCORD_MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+def _discord_file_size(file: discord.File) -> int:
+    fp = file.fp
+    try:
+        pos = fp.tell()
+        size = fp.seek(0, os.SEEK_END)
+        fp.seek(pos)
+        return size - pos
+    except Exception:
+        return 0
+
+def _new_batch_files(files: list[discord.File], batch_files: dict[str, discord.File]) -> dict[str, discord.File]:
+    # 同じファイル名の添付は1メッセージに1回だけ載せる
+    new_files: dict[str, discord.File] = {}
+    for f in files:
+        if f.filename not in batch_files and f.filename not in new_files:
+            new_files[f.filename] = f
+    return new_files
+
+# 送信キューの優先度 (小さいほど先に送る)
+_SEND_PRIORITY_INTERACTION = 0
+_SEND_PRIORITY_NOTIFY = 1
+_SEND_PRIORITY_LABELS = {_SEND_PRIORITY_INTERACTION: "応答", _SEND_PRIORITY_NOTIFY: "通知"}
+
+
+class _TokenBucket:
+    def __init__(self, capacity: float, period: float) -> None:
+        self.capacity = max(1.0, float(capacity))
+        self.rate = self.capacity / max(0.001, float(period))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """次の1件を送れるまでの秒数"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def block(self, until: float) -> None:
+        # 429 を受けたら retry_after まで止め、溜まっていた分も捨てる
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 0.0
+
+
+class _SendQueueClosed(Exception):
+    """Bot の終了で送信キューが止まり、送られなかった"""
+
+
+class _OutboundQueue:
+    """Discord への送信を一か所に集める。
+
+    インタラクションの followup を通知より先に送り、ルート (チャンネルやインタラクション) ごとと全体の
+    トークンバケットで送信間隔を揃える。同じチャンネルへの通知が NOTIFY_BATCH_WINDOW_SECONDS 以内に
+    重なったら、上限内で1通にまとめて送る。
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[dict] = []
+        self._seq = itertools.count()
+        self._routes: dict[tuple, _TokenBucket] = {}
+        self._global = _TokenBucket(max(1.0, DISCORD_GLOBAL_REQUESTS_PER_SECOND), 1.0)
+        self._wake: asyncio.Event | None = None
+        self._workers: list[asyncio.Task] = []
+        self._waits = {priority: deque(maxlen=COMMAND_METRICS_WINDOW) for priority in _SEND_PRIORITY_LABELS}
+        self.sent = 0
+        self.batched = 0
+        self.rate_limited = 0
+        self.skipped = 0
+        self._closed = False
+
+    def _route(self, route: tuple) -> _TokenBucket:
+        bucket = self._routes.get(route)
+        if bucket is None:
+            bucket = self._routes[route] = _TokenBucket(DISCORD_ROUTE_BURST, DISCORD_ROUTE_PERIOD_SECONDS)
+        return bucket
+
+    def _enqueue(self, item: dict) -> asyncio.Future:
+        if self._closed:
+            raise _SendQueueClosed()
+        loop = asyncio.get_running_loop()
+        item.setdefault("future", loop.create_future())
+        item.setdefault("seq", next(self._seq))
+        item.setdefault("enqueued", time.monotonic())
+        item.setdefault("attempts", 0)
+        self._pending.append(item)
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < max(1, DISCORD_SEND_WORKERS):
+            task = loop.create_task(self._worker(), name=f"outbound-send-{len(self._workers)}")
+            task.add_done_callback(self._worker_done)
+            self._workers.append(task)
+        self._wake.set()
+        return item["future"]
+
+    async def submit(self, route: tuple, factory, *, priority: int = _SEND_PRIORITY_NOTIFY):
+        """factory() が返す送信処理を、route のレート制限に合わせて実行した結果を返す
+
+        429 で積み直したときは factory() を呼び直す。送信で閉じられる discord.File は factory の中で作ること。
+        """
+        return await self._enqueue(
+            {"route": route, "priority": priority, "factory": factory, "ready_at": time.monotonic()}
+        )
 
-def _build_event_payload_from_item(
-    item: dict,
-    title_prefix: str,
+    async def submit_notify(self, channel, embeds: list[discord.Embed], blobs: list) -> discord.Message | None:
+        """チャンネルへの通知。直後に同じチャンネルへ送る通知があれば1通にまとめる"""
+        return await self._enqueue(
+            {
+                "route": ("channel", channel.id),
+                "priority": _SEND_PRIORITY_NOTIFY,
+                "batch": (channel, embeds, blobs),
+                "ready_at": time.monotonic() + max(0.0, NOTIFY_BATCH_WINDOW_SECONDS),
+            }
+        )
+
+    def _worker_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Send queue worker stopped: {task.exception()!r}")
+
+    def _drop_abandoned(self) -> None:
+        # 待っていた呼び出し側がキャンセルされた送信は、もう送らない
+        abandoned = [item for item in self._pending if item["future"].done()]
+        for item in abandoned:
+            self._pending.remove(item)
+        self.skipped += len(abandoned)
+
+    def _take(self) -> tuple[dict | None, float | None]:
+        self._drop_abandoned()
+        now = time.monotonic()
+        global_delay = self._global.delay(now)
+        best = None
+        next_delay = None
+        for item in self._pending:
+            delay = max(item["ready_at"] - now, self._route(item["route"]).delay(now), global_delay)
+            if delay <= 0:
+                if best is None or (item["priority"], item["seq"]) < (best["priority"], best["seq"]):
+                    best = item
+            elif next_delay is None or delay < next_delay:
+                next_delay = delay
+        if best is None:
+            return None, next_delay
+        self._pending.remove(best)
+        self._route(best["route"]).take(now)
+        self._global.take(now)
+        if len(self._routes) > 1000:
+            # 使い終わったルート (インタラクションごとのものなど) は満タンになったら捨てる
+            active = {item["route"] for item in self._pending}
+            for route, bucket in list(self._routes.items()):
+                if route not in active and bucket.delay(now) <= 0 and bucket.tokens >= bucket.capacity:
+                    del self._routes[route]
+        return best, None
+
+    def _take_batch(self, first: dict) -> list[dict]:
+        # 同じチャンネル宛てで待ち時間を過ぎた通知を、1メッセージの上限に収まるだけ後ろにつなげる
+        channel, embeds, blobs = first["batch"]
+        guild = getattr(channel, "guild", None)
+        size_limit = guild.filesize_limit if guild else DISCORD_UPLOAD_LIMIT_BYTES
+        names = {name for name, _, _ in blobs}
+        count_embeds = len(embeds)
+        chars = sum(len(embed) for embed in embeds)
+        size = sum(len(data) for _, _, data in blobs)
+        items = [first]
+        now = time.monotonic()
+        for item in sorted(self._pending, key=lambda i: i["seq"]):
+            if (
+                item.get("batch") is None
+                or item["route"] != first["route"]
+                or item["ready_at"] > now
+                or item["future"].done()
+            ):
+                continue
+            _, more_embeds, more_blobs = item["batch"]
+            new_blobs = [blob for blob in more_blobs if blob[0] not in names]
+            more_chars = sum(len(embed) for embed in more_embeds)
+            if (
+                count_embeds + len(more_embeds) > DISCORD_MAX_EMBEDS_PER_MESSAGE
+                or len(names) + len(new_blobs) > DISCORD_MAX_FILES_PER_MESSAGE
+                or chars + more_chars > DISCORD_MAX_EMBED_CHARS_PER_MESSAGE
+                or size + sum(len(data) for _, _, data in new_blobs) > size_limit
+            ):
+                break
+            self._pending.remove(item)
+            items.append(item)
+            names.update(blob[0] for blob in new_blobs)
+            count_embeds += len(more_embeds)
+            chars += more_chars
+            size += sum(len(data) for _, _, data in new_blobs)
+        return items
+
+    async def _send_batch(self, items: list[dict]):
+        channel = items[0]["batch"][0]
+        embeds: list[discord.Embed] = []
+        blobs: dict[str, tuple] = {}
+        for item in items:
+            _, item_embeds, item_blobs = item["batch"]
+            embeds.extend(embed.copy() for embed in item_embeds)
+            for blob in item_blobs:
+                blobs.setdefault(blob[0], blob)
+        return await _send_with_attachment_cache(
+            channel.send, embeds=embeds, files=_files_from_snapshot(list(blobs.values())), reuse=False
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            item, delay = self._take()
+            if item is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            items = self._take_batch(item) if item.get("batch") is not None else [item]
+            if len(items) > 1:
+                self.batched += len(items) - 1
+            started = time.monotonic()
+            for queued in items:
+                self._waits[queued["priority"]].append(started - queued["enqueued"])
+            try:
+                result = await (self._send_batch(items) if item.get("batch") is not None else item["factory"]())
+            except asyncio.CancelledError:
+                for queued in items:
+                    if not queued["future"].done():
+                        queued["future"].set_exception(_SendQueueClosed())
+                raise
+            except Exception as e:
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None or getattr(e, "status", None) == 429:
+                    # discord.py が待ちきれなかった 429。ルートを止めて、まとめた分は個別に積み直す
+                    self.rate_limited += 1
+                    until = time.monotonic() + float(retry_after or DISCORD_ROUTE_PERIOD_SECONDS)
+                    self._route(item["route"]).block(until)
+                    for queued in items:
+                        queued["attempts"] += 1
+                        if queued["attempts"] < 3:
+                            queued["ready_at"] = until
+                            self._pending.append(queued)
+                        elif not queued["future"].done():
+                            queued["future"].set_exception(e)
+                    continue
+                for queued in items:
+                    if not queued["future"].done():
+                        queued["future"].set_exception(e)
+                continue
+            self.sent += 1
+            for queued in items:
+                if not queued["future"].done():
+                    queued["future"].set_result(result)
+
+    def stats(self) -> dict:
+        depth = {priority: 0 for priority in _SEND_PRIORITY_LABELS}
+        for item in self._pending:
+            depth[item["priority"]] = depth.get(item["priority"], 0) + 1
+        return {
+            "depth": depth,
+            "waits": self._waits,
+            "sent": self.sent,
+            "batched": self.batched,
+            "rate_limited": self.rate_limited,
+            "skipped": self.skipped,
+        }
+
+    def stop(self) -> None:
+        # 待っている側には CancelledError ではなく _SendQueueClosed を返し、終了処理として扱わせる
+        self._closed = True
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+        for item in self._pending:
+            if not item["future"].done():
+                item["future"].set_exception(_SendQueueClosed())
+        self._pending.clear()
+        if self._wake is not None:
+            self._wake.set()
+
+
+_OUTBOUND = _OutboundQueue()
+
+async def _queue_followup(interaction: discord.Interaction, factory):
+    """interaction.followup での送信を、通知より優先して送信キューに流す
+
+    429 のときは factory() をもう一度呼ぶので、添付は呼ばれるたびに作り直すこと。
+    """
+    return await _OUTBOUND.submit(("interaction", interaction.id), factory, priority=_SEND_PRIORITY_INTERACTION)
+
+async def _as_embed_payload(result) -> tuple[list[discord.Embed], list[discord.File] | None] | None:
+    # (embed, files, error) を返すビルダーを _send_ephemeral_payloads 用の形に変える
+    embed, files, error = await result if inspect.isawaitable(result) else result
+    if error or not embed:
+        return None
+    return [embed], files
+
+async def _send_ephemeral_payloads(interaction: discord.Interaction, payloads) -> int:
+    """スロットごとのペイロードを Discord の上限内でできるだけ少ないメッセージにまとめて送る。
+
+    payloads には (embeds, files) か、それを返す awaitable を順番に渡す。
+    描画中のものは順に待ちながら、まとまった分から先に送る。送ったメッセージ数を返す。
+    """
+    size_limit = interaction.guild.filesize_limit if interaction.guild else DISCORD_UPLOAD_LIMIT_BYTES
+    pending = [asyncio.ensure_future(p) if inspect.isawaitable(p) else p for p in payloads]
+    batch_embeds: list[discord.Embed] = []
+    batch_files: dict[str, discord.File] = {}
+    batch_chars = 0
+    batch_bytes = 0
+    sent = 0
+
+    async def flush() -> None:
+        nonlocal batch_embeds, batch_files, batch_chars, batch_bytes, sent
+        if not batch_embeds:
+            return
+        files = list(batch_files.values())
+        if sent == 0 and not interaction.response.is_done():
+            await _send_with_attachment_cache(
+                interaction.response.send_message,
+                embeds=batch_embeds,
+                files=files,
+                ephemeral=True,
+                interaction=interaction,
+            )
+        else:
+            # 429 で積み直されると作り直しになるので、送信ごとに新しい discord.File を渡す
+            blobs = _snapshot_files(files)
+            await _queue_followup(
+                interaction,
+                lambda embeds=batch_embeds: _send_with_attachment_cache(
+                    interaction.followup.send, embeds=embeds, files=_files_from_snapshot(blobs), ephemeral=True
+                ),
+            )
+        sent += 1
+        batch_embeds, batch_files, batch_chars, batch_bytes = [], {}, 0, 0
+
+    try:
+        for item in pending:
+            payload = await item if asyncio.isfuture(item) else item
+            if not payload:
+                continue
+            embeds, files = payload
+            if not embeds:
+                continue
+            # 送信済みの添付は URL 参照に変わるので、実際にアップロードするファイルだけで数える
+            files = _reuse_cached_attachments(embeds, list(files or []))
+            new_files = _new_batch_files(files, batch_files)
+            chars = sum(len(embed) for embed in embeds)
+            size = sum(_discord_file_size(f) for f in new_files.values())
+            if batch_embeds and (
+                len(batch_embeds) + len(embeds) > DISCORD_MAX_EMBEDS_PER_MESSAGE
+                or len(batch_files) + len(new_files) > DISCORD_MAX_FILES_PER_MESSAGE
+                or batch_chars + chars > DISCORD_MAX_EMBED_CHARS_PER_MESSAGE
+                or batch_bytes + size > size_limit
+            ):
+                await flush()
+                # エフェメラルの送信は URL を覚えないので、前のメッセージと共有していた添付は新しいメッセージに載せ直す。
+                # 送信を待つ間に他の (公開の) 送信が覚えた URL があれば、それだけは使う
+                files = _reuse_cached_attachments(embeds, files)
+                new_files = _new_batch_files(files, batch_files)
+                size = sum(_discord_file_size(f) for f in new_files.values())
+            for f in files:
+                if new_files.get(f.filename) is not f:
+                    f.close()
+            batch_embeds.extend(embeds)
+            batch_files.update(new_files)
+            batch_chars += chars
+            batch_bytes += size
+        await flush()
+    finally:
+        for item in pending:
+            if asyncio.isfuture(item) and not item.done():
+                item.cancel()
+    return sent
+
+async def _send_ephemeral_text(interaction: discord.Interaction, text: str) -> None:
+    if interaction.response.is_done():
+        await _queue_followup(interaction, lambda: interaction.followup.send(text, ephemeral=True))
+    else:
+        await interaction.response.send_message(text, ephemeral=True)
+
+
+class _SlotPagerView(discord.ui.View):
+    """/all-* の結果を1スロットずつ表示する。表示中のスロットの次は裏で先に描画しておく"""
+
+    def __init__(self, builders: list, empty_text: str):
+        super().__init__(timeout=ALL_COMMANDS_VIEW_TIMEOUT_SECONDS)
+        self._builders = builders
+        self._empty_text = empty_text
+        self._slots: dict[int, asyncio.Future] = {}
+        self.index = 0
+        # ページ送りが重なると index と添付の載せ替えが競合するので、1つずつ処理する
+        self._lock = asyncio.Lock()
+        # タイムアウトでボタンを無効にするときに編集する、最後に応答したインタラクション (またはフォローアップ)
+        self.interaction: discord.Interaction | None = None
+        self.message: discord.WebhookMessage | None = None
+
+    def _slot(self, index: int) -> asyncio.Future | None:
+        if not 0 <= index < len(self._builders):
+            return None
+        task = self._slots.get(index)
+        if task is None:
+            task = asyncio.ensure_future(self._builders[index]())
+            self._slots[index] = task
+        return task
+
+    async def page_kwargs(self) -> dict:
+        index = self.index
+        task = self._slot(index)
+        self._slot(index + 1)
+        try:
+            payload = await task
+        except Exception as e:
+            print(f"Error building page {index}: {e}")
+            payload = None
+        # 送信した discord.File は使い回せないので、表示したスロットは次に開いたとき作り直す
+        self._slots.pop(index, None)
+
+        self.prev_button.disabled = index <= 0
+        self.next_button.disabled = index >= len(self._builders) - 1
+        self.page_button.label = f"{index + 1}/{len(self._builders)}"
+
+        embeds, files = payload if payload else (None, None)
+        if not embeds:
+            return {"content": self._empty_text, "embeds": [], "files": []}
+        return {"content": None, "embeds": embeds, "files": list(files or [])}
+
+    async def _show(self, interaction: discord.Interaction, step: int) -> None:
+        await interaction.response.defer()
+        async with self._lock:
+            index = self.index + step
+            if self.is_finished() or not 0 <= index < len(self._builders):
+                return
+            self.index = index
+            self.interaction = interaction
+            kwargs = await self.page_kwargs()
+            # attachments= はメッセージの添付を丸ごと置き換えるので、ページの添付はすべて載せ直す。
+            # 編集されるエフェメラルのメッセージなので、ここの URL はキャッシュに入れない
+            await interaction.edit_original_response(
+                content=kwargs["content"],
+                embeds=kwargs["embeds"],
+                attachments=kwargs["files"],
+                view=self,
+            )
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, -1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 1)
+
+    async def on_timeout(self) -> None:
+        async with self._lock:
+            # 先に描画しておいたページは表示されないので、添付を閉じる (描画中なら止める)
+            for task in self._slots.values():
+                _discard_prepared_payload(task)
+            self._slots.clear()
+            for item in self.children:
+                item.disabled = True
+            try:
+                if self.interaction is not None:
+                    await self.interaction.edit_original_response(view=self)
+                elif self.message is not None:
+                    await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+async def _send_slot_pages(interaction: discord.Interaction, builders: list, empty_text: str) -> None:
+    """/all-* の各スロットを送る。builders は (embeds, files) を返す awaitable を作る関数のリスト"""
+    if not builders:
+        await _send_ephemeral_text(interaction, empty_text)
+        return
+    if not ALL_COMMANDS_PAGINATED:
+        if not await _send_ephemeral_payloads(interaction, [build() for build in builders]):
+            await _send_ephemeral_text(interaction, empty_text)
+        return
+
+    view = _SlotPagerView(builders, empty_text)
+    kwargs = await view.page_kwargs()
+    extra = {"view": view} if len(builders) > 1 else {}
+    if not kwargs["embeds"]:
+        if interaction.response.is_done():
+            view.message = await _queue_followup(
+                interaction, lambda: interaction.followup.send(kwargs["content"], ephemeral=True, **extra)
+            )
+        else:
+            view.interaction = interaction
+            await interaction.response.send_message(kwargs["content"], ephemeral=True, **extra)
+        return
+    if interaction.response.is_done():
+        blobs = _snapshot_files(kwargs["files"])
+        view.message = await _queue_followup(
+            interaction,
+            lambda: _send_with_attachment_cache(
+                interaction.followup.send,
+                embeds=kwargs["embeds"],
+                files=_files_from_snapshot(blobs),
+                ephemeral=True,
+                **extra,
+            ),
+        )
+    else:
+        view.interaction = interaction
+        await _send_with_attachment_cache(
+            interaction.response.send_message,
+            embeds=kwargs["embeds"],
+            files=kwargs["files"],
+            ephemeral=True,
+            interaction=interaction,
+            **extra,
+        )
+
+def _get_current_event_item(data: dict, at: datetime | None = None) -> dict | None:
+    results = data.get("results") or []
+    return _find_current_item(results, at)
+
+async def _build_event_payload_from_item(
+    item: dict,
+    title_prefix: str,
     status_label: str | None,
 ) -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
     rule = _format_rule(item.get("rule"))
@@ -1628,7 +2777,7 @@ def _build_event_payload_from_item(
     stage2_path = _find_local_image_by_name(stage2_name)
     rule_icon_path = _find_local_rule_icon(rule)
 
-    card_bytes = _render_stage_card_bytes(
+    card_bytes = await _render_stage_card_cached(
         rule_name=rule,
         rule_icon_path=rule_icon_path,
         stage1_name=stage1_name,
@@ -1637,7 +2786,7 @@ def _build_event_payload_from_item(
         stage2_path=stage2_path,
     )
     if card_bytes:
-        filename = f"event_{hashlib.md5(card_bytes).hexdigest()}.png"
+        filename = f"event_{hashlib.md5(card_bytes).hexdigest()}{_image_extension('stage')}"
         embed.set_image(url=f"attachment://{filename}")
         files_by_name[filename] = discord.File(fp=io.BytesIO(card_bytes), filename=filename)
     else:
@@ -1649,8 +2798,8 @@ def _build_event_payload_from_item(
 
     return embed, list(files_by_name.values()), None
 
-def _get_event_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
-    data = get_event_schedule()
+async def _get_event_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
+    data = await get_event_schedule()
     if not data:
         return None, None, "データの取得に失敗しました。"
 
@@ -1660,7 +2809,7 @@ def _get_event_payload() -> tuple[discord.Embed | None, list[discord.File] | Non
 
     current = _get_current_event_item(data)
     if current:
-        return _build_event_payload_from_item(current, "イベントマッチ情報", "開催中")
+        return await _build_event_payload_from_item(current, "イベントマッチ情報", "開催中")
 
     now = datetime.now().astimezone()
     for item in results:
@@ -1669,27 +2818,199 @@ def _get_event_payload() -> tuple[discord.Embed | None, list[discord.File] | Non
         except Exception:
             continue
         if now < end_time:
-            return _build_event_payload_from_item(item, "イベントマッチ情報", "次回")
+            return await _build_event_payload_from_item(item, "イベントマッチ情報", "次回")
+
+    return await _build_event_payload_from_item(results[0], "イベントマッチ情報", None)
+
+# 通知の種類 -> (表示名, 環境変数で指定された送信先)
+_NOTIFY_FEATURES = {
+    "stage": ("ステージ", STAGE_NOTIFY_CHANNEL_ID),
+    "event": ("イベントマッチ", EVENT_NOTIFY_CHANNEL_ID),
+    "salmon": ("サーモンラン", SALMON_NOTIFY_CHANNEL_ID),
+    "team_contest": ("バイトチームコンテスト", TEAM_CONTEST_NOTIFY_CHANNEL_ID),
+    "fest": ("フェス", FEST_NOTIFY_CHANNEL_ID),
+    "gear": ("ギア更新", GEAR_NOTIFY_CHANNEL_ID),
+    "coop_monthly": ("サーモンラン月替わりギア", COOP_MONTHLY_NOTIFY_CHANNEL_ID),
+    "xrank": ("Xランキング", XRANK_NOTIFY_CHANNEL_ID),
+}
+# 送信履歴の種類 -> 送信先を共有する通知の種類
+_NOTIFY_MESSAGE_CHANNEL_FEATURES = {"fest_stage": "fest"}
+
+def _stored_notify_channel_ids(state: dict, feature: str) -> list[int]:
+    # 以前の1チャンネルだけの設定 (*_notify_channel_id) も購読として扱う
+    channel_ids = [int(channel_id) for channel_id in state.get(f"{feature}_notify_channel_ids") or []]
+    legacy = int(state.get(f"{feature}_notify_channel_id") or 0)
+    if legacy and legacy not in channel_ids:
+        channel_ids.insert(0, legacy)
+    return channel_ids
+
+def _legacy_stage_channel_id(state: dict) -> int:
+    # 以前の1チャンネルだけの設定では、未設定の種類もステージ通知の送信先に送っていた
+    return int(state.get("stage_notify_channel_id") or STAGE_NOTIFY_CHANNEL_ID or 0)
 
-    return _build_event_payload_from_item(results[0], "イベントマッチ情報", None)
+def _notify_channel_ids(state: dict, feature: str) -> list[int]:
+    """通知の送信先チャンネルを返す。
+
+    一度も設定されていない種類は、以前の1チャンネル設定 (状態ファイルか環境変数) のステージ通知先にだけ送る。
+    /notify_here で追加した購読はサーバーをまたぐので、他の種類へは広げない。
+    """
+    channel_ids = _stored_notify_channel_ids(state, feature)
+    env_value = _NOTIFY_FEATURES[feature][1]
+    if env_value and env_value not in channel_ids:
+        channel_ids.append(env_value)
+    if not channel_ids and feature != "stage" and f"{feature}_notify_channel_ids" not in state:
+        legacy = _legacy_stage_channel_id(state)
+        return [legacy] if legacy else []
+    return channel_ids
+
+def _set_notify_channel_ids(state: dict, feature: str, channel_ids: list[int]) -> None:
+    updates: dict = {f"{feature}_notify_channel_ids": channel_ids}
+    if state.get(f"{feature}_notify_channel_id"):
+        updates[f"{feature}_notify_channel_id"] = None
+        if feature == "stage":
+            # 以前のステージ通知先を購読に移すとフォールバックが消えるので、未設定の種類は明示的に購読させる
+            legacy = int(state["stage_notify_channel_id"])
+            for other, (_, env_value) in _NOTIFY_FEATURES.items():
+                if other == "stage" or env_value or f"{other}_notify_channel_ids" in state:
+                    continue
+                if not _stored_notify_channel_ids(state, other):
+                    updates[f"{other}_notify_channel_ids"] = [legacy]
+    _update_state(updates)
+
+def _uses_stage_fallback(state: dict, feature: str) -> bool:
+    # 一度も設定されておらず、以前のステージ通知先に送っている種類か
+    return (
+        feature != "stage"
+        and not _NOTIFY_FEATURES[feature][1]
+        and f"{feature}_notify_channel_ids" not in state
+        and not _stored_notify_channel_ids(state, feature)
+    )
 
-def _resolve_notify_channel_id(state: dict, state_key: str, env_value: int) -> int:
-    value = int(state.get(state_key) or env_value or 0)
-    if value:
-        return value
-    return int(state.get("stage_notify_channel_id") or STAGE_NOTIFY_CHANNEL_ID or 0)
+def _subscribe_notify_channel(feature: str, channel_id: int) -> bool:
+    """購読を追加する。既に登録済みなら False"""
+    state = _load_state()
+    channel_ids = _stored_notify_channel_ids(state, feature)
+    if _uses_stage_fallback(state, feature):
+        # 以前のステージ通知先に届いていた分は、明示的な購読として残してから追加する
+        channel_ids = _notify_channel_ids(state, feature)
+    if channel_id in channel_ids:
+        return False
+    _set_notify_channel_ids(state, feature, channel_ids + [channel_id])
+    return True
+
+def _unsubscribe_notify_channel(feature: str, channel_id: int) -> bool:
+    """購読を解除する。登録されていなければ False"""
+    state = _load_state()
+    channel_ids = _stored_notify_channel_ids(state, feature)
+    if channel_id not in channel_ids:
+        if not _uses_stage_fallback(state, feature) or channel_id not in _notify_channel_ids(state, feature):
+            return False
+        # ステージ通知の送信先に届いていた種類は、残りの送信先を明示的な購読にしてから外す
+        channel_ids = _notify_channel_ids(state, feature)
+    _set_notify_channel_ids(state, feature, [c for c in channel_ids if c != channel_id])
+    return True
+
+def _last_message_ids(state: dict, feature: str) -> dict[int, int]:
+    """チャンネルごとの前回の通知メッセージ ID"""
+    message_ids = {int(channel_id): int(message_id) for channel_id, message_id in (state.get(f"{feature}_last_message_ids") or {}).items()}
+    legacy = state.get(f"{feature}_last_message_id")
+    channel_feature = _NOTIFY_MESSAGE_CHANNEL_FEATURES.get(feature, feature)
+    legacy_channel = int(state.get(f"{channel_feature}_notify_channel_id") or _NOTIFY_FEATURES[channel_feature][1] or 0)
+    if legacy and legacy_channel:
+        message_ids.setdefault(legacy_channel, int(legacy))
+    return message_ids
+
+def _last_message_updates(state: dict, feature: str, sent: dict[int, discord.Message]) -> dict:
+    # 今回送れたチャンネルの分だけで作り直す。購読をやめたチャンネルや、前回分を消したあと送れなかった
+    # チャンネルの ID を残すと、毎回消し直して保存し直すことになる
+    message_ids = {str(channel_id): int(message.id) for channel_id, message in sent.items()}
+    updates: dict = {f"{feature}_last_message_ids": message_ids}
+    if state.get(f"{feature}_last_message_id"):
+        updates[f"{feature}_last_message_id"] = None
+    return updates
+
+def _snapshot_files(files) -> list[tuple[str, str | None, bytes]]:
+    # 添付は送信ごとに閉じられるので、中身を一度だけ読んでおいてチャンネルごとに作り直す
+    blobs = []
+    for f in files or []:
+        try:
+            f.reset()
+            blobs.append((f.filename, getattr(f, "description", None), f.fp.read()))
+        finally:
+            f.close()
+    return blobs
+
+def _files_from_snapshot(blobs: list[tuple[str, str | None, bytes]]) -> list[discord.File]:
+    return [discord.File(fp=io.BytesIO(data), filename=filename, description=description) for filename, description, data in blobs]
+
+async def _fan_out_notification(
+    channel_ids: list[int], *, embeds=None, embed=None, files=None, replace_message_ids: dict[int, int] | None = None
+) -> dict[int, discord.Message]:
+    """描画済みのペイロードを全購読チャンネルへ送る。送れたチャンネル -> メッセージを返す
+
+    描画は呼び出し側で1回だけ行い、添付はチャンネルごとにアップロードする (他サーバーのメッセージの
+    URL に頼ると、そちらが消されたときに全チャンネルの画像が切れるため)。全チャンネル分をまとめて
+    送信キューに積む (チャンネルの取得は NOTIFY_FANOUT_CONCURRENCY 件ずつ)。replace_message_ids を
+    渡したときはチャンネルごとに前回のメッセージを消してから送り、他の通知とはまとめない。
+    """
+    blobs = _snapshot_files(files)
+    embed_list = list(embeds) if embeds is not None else ([embed] if embed is not None else [])
+    semaphore = asyncio.Semaphore(max(1, NOTIFY_FANOUT_CONCURRENCY))
+    sent: dict[int, discord.Message] = {}
+
+    async def deliver(channel_id: int) -> None:
+        async with semaphore:
+            channel = await _get_text_channel(channel_id)
+        if channel is None:
+            print(f"Notify channel {channel_id} is not available")
+            return
+        old_message_id = (replace_message_ids or {}).get(channel_id)
+        if old_message_id:
+            _forget_attachment_urls(channel_id, old_message_id)
+            try:
+                await _OUTBOUND.submit(
+                    ("delete", channel_id), lambda: channel.get_partial_message(int(old_message_id)).delete()
+                )
+            except Exception:
+                pass
+        try:
+            if replace_message_ids is None:
+                # 入れ替えない通知は、同じタイミングの他の通知と1通にまとめてよい
+                message = await _OUTBOUND.submit_notify(channel, embed_list, blobs)
+            else:
+                message = await _OUTBOUND.submit(
+                    ("channel", channel_id),
+                    lambda: _send_with_attachment_cache(
+                        channel.send,
+                        embeds=[e.copy() for e in embed_list],
+                        files=_files_from_snapshot(blobs),
+                        remember=False,
+                        reuse=False,
+                    ),
+                )
+        except _SendQueueClosed:
+            # Bot の終了中。送れなかったチャンネルは次回の実行で送る
+            return
+        except Exception as e:
+            print(f"Error sending notification to {channel_id}: {e}")
+            return
+        if isinstance(message, discord.Message):
+            sent[channel_id] = message
 
-def _get_current_salmon_item(data: dict) -> dict | None:
+    await asyncio.gather(*(deliver(channel_id) for channel_id in dict.fromkeys(channel_ids)))
+    return sent
+
+def _get_current_salmon_item(data: dict, at: datetime | None = None) -> dict | None:
     results = data.get("results") or []
-    return _find_current_item(results)
+    return _find_current_item(results, at)
 
-def _get_current_team_contest_item(data: dict) -> dict | None:
+def _get_current_team_contest_item(data: dict, at: datetime | None = None) -> dict | None:
     results = data.get("results") or []
-    return _find_current_item(results)
+    return _find_current_item(results, at)
 
-def _get_current_fest_match_item(data: dict) -> dict | None:
+def _get_current_fest_match_item(data: dict, at: datetime | None = None) -> dict | None:
     results = data.get("results") or []
-    return _find_current_item(results)
+    return _find_current_item(results, at)
 
 def _normalize_gear_items(entries: list[dict]) -> list[dict]:
     items: list[dict] = []
@@ -1734,11 +3055,26 @@ def _serialize_gear_items(items: list[dict]) -> list[dict]:
     return [{"id": item.get("id"), "name": item.get("name"), "price": item.get("price")} for item in items]
 
 
-def _build_gear_rotation_payload(
+async def _attach_gear_collage(
+    embed: discord.Embed, sections: list[tuple[str, list[dict]]], prefix: str
+) -> list[discord.File]:
+    # 画像は先に並行取得しておき、全セクションを1回の描画で1枚にまとめる
+    sections = [(title, items) for title, items in sections if items]
+    resolved = await asyncio.gather(*(_with_gear_image_paths(items) for _, items in sections))
+    sections = [(title, items) for (title, _), items in zip(sections, resolved)]
+    collage = await _run_render(_render_gear_collage_bytes, sections)
+    if not collage:
+        return []
+    filename = f"{prefix}_{hashlib.md5(collage).hexdigest()}{_image_extension('gear')}"
+    embed.set_image(url=f"attachment://{filename}")
+    return [discord.File(fp=io.BytesIO(collage), filename=filename)]
+
+
+def _build_gear_rotation_embed(
     limited_items: list[dict],
     added_keys: set[str],
     removed_items: list[dict],
-) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+) -> discord.Embed:
     embed = discord.Embed(title="【販売ギア入れ替わり】", color=0x4CAF50)
 
     if removed_items:
@@ -1763,20 +3099,20 @@ def _build_gear_rotation_payload(
         embed.add_field(name="販売中ギア", value="\n".join(lines), inline=False)
     else:
         embed.add_field(name="販売中ギア", value="なし", inline=False)
+    return embed
 
-    files_by_name: dict[str, discord.File] = {}
-    collage = _render_gear_collage_bytes(limited_items, "販売中ギア")
-    if collage:
-        filename = f"gear_limited_{hashlib.md5(collage).hexdigest()}.png"
-        embed.set_image(url=f"attachment://{filename}")
-        files_by_name[filename] = discord.File(fp=io.BytesIO(collage), filename=filename)
 
-    return [embed], list(files_by_name.values()), None
+async def _build_gear_rotation_payload(
+    limited_items: list[dict],
+    added_keys: set[str],
+    removed_items: list[dict],
+) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+    embed = _build_gear_rotation_embed(limited_items, added_keys, removed_items)
+    files = await _attach_gear_collage(embed, [("販売中ギア", limited_items)], "gear_limited")
+    return [embed], files, None
 
 
-def _build_pickup_payload(
-    pickup: dict, pickup_items: list[dict]
-) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+def _build_pickup_embed(pickup: dict, pickup_items: list[dict]) -> discord.Embed:
     embed = discord.Embed(title="【ピックアップ更新】", color=0x4CAF50)
 
     sale_end = pickup.get("saleEndTime") or ""
@@ -1800,17 +3136,17 @@ def _build_pickup_payload(
         embed.add_field(name="ピックアップ", value="\n".join(lines), inline=False)
     else:
         embed.add_field(name="ピックアップ", value="なし", inline=False)
+    return embed
 
-    files_by_name: dict[str, discord.File] = {}
-    collage = _render_gear_collage_bytes(pickup_items, "ピックアップ")
-    if collage:
-        filename = f"gear_pickup_{hashlib.md5(collage).hexdigest()}.png"
-        embed.set_image(url=f"attachment://{filename}")
-        files_by_name[filename] = discord.File(fp=io.BytesIO(collage), filename=filename)
 
-    return [embed], list(files_by_name.values()), None
+async def _build_pickup_payload(
+    pickup: dict, pickup_items: list[dict]
+) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+    embed = _build_pickup_embed(pickup, pickup_items)
+    files = await _attach_gear_collage(embed, [("ピックアップ", pickup_items)], "gear_pickup")
+    return [embed], files, None
 
-def _build_gear_payloads(data: dict) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+async def _build_gear_payloads(data: dict) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
     try:
         gesotown = data.get("data", {}).get("gesotown", {})
     except Exception:
@@ -1822,27 +3158,17 @@ def _build_gear_payloads(data: dict) -> tuple[list[discord.Embed] | None, list[d
     pickup_items = _normalize_gear_items(pickup.get("brandGears") or [])
     limited_items = _normalize_gear_items(limited)
 
-    embeds: list[discord.Embed] = []
-    files_by_name: dict[str, discord.File] = {}
-
-    rotation_embeds, rotation_files, _ = _build_gear_rotation_payload(limited_items, set(), [])
-    if rotation_embeds:
-        embeds.extend(rotation_embeds)
-    if rotation_files:
-        for f in rotation_files:
-            files_by_name[f.filename] = f
-
-    pickup_embeds, pickup_files, _ = _build_pickup_payload(pickup, pickup_items)
-    if pickup_embeds:
-        embeds.extend(pickup_embeds)
-    if pickup_files:
-        for f in pickup_files:
-            files_by_name[f.filename] = f
-
-    if not embeds:
-        return None, None, "ゲソタウンの情報がありません。"
-
-    return embeds, list(files_by_name.values()), None
+    embeds = [
+        _build_gear_rotation_embed(limited_items, set(), []),
+        _build_pickup_embed(pickup, pickup_items),
+    ]
+    # 販売中ギアとピックアップは1枚の画像にまとめ、最後の Embed に載せる
+    files = await _attach_gear_collage(
+        embeds[-1],
+        [("販売中ギア", limited_items), ("ピックアップ", pickup_items)],
+        "gear",
+    )
+    return embeds, files, None
 
 def _build_coop_monthly_payload(data: dict) -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
     try:
@@ -1926,7 +3252,7 @@ def _build_fest_payload_from_record(record: dict) -> tuple[discord.Embed | None,
 
     return embed, list(files_by_name.values()), None
 
-def _build_fest_match_embed_from_item(
+async def _build_fest_match_embed_from_item(
     item: dict,
     title: str,
     color: int,
@@ -1947,7 +3273,7 @@ def _build_fest_match_embed_from_item(
     rule_icon_path = _find_local_rule_icon(rule)
     stage1_path = _find_local_image_by_name(stage1_name)
     stage2_path = _find_local_image_by_name(stage2_name)
-    card_bytes = _render_stage_card_bytes(
+    card_bytes = await _render_stage_card_cached(
         rule_name=rule,
         rule_icon_path=rule_icon_path,
         stage1_name=stage1_name,
@@ -1956,7 +3282,7 @@ def _build_fest_match_embed_from_item(
         stage2_path=stage2_path,
     )
     if card_bytes:
-        filename = f"fest_card_{hashlib.md5(card_bytes).hexdigest()}.png"
+        filename = f"fest_card_{hashlib.md5(card_bytes).hexdigest()}{_image_extension('stage')}"
         embed.set_image(url=f"attachment://{filename}")
         if filename not in files_by_name:
             files_by_name[filename] = discord.File(fp=io.BytesIO(card_bytes), filename=filename)
@@ -1968,7 +3294,7 @@ def _build_fest_match_embed_from_item(
 
     return embed
 
-def _build_fest_match_payload(
+async def _build_fest_match_payload(
     open_item: dict | None,
     challenge_item: dict | None,
 ) -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
@@ -1976,22 +3302,23 @@ def _build_fest_match_payload(
         return None, None, "フェスマッチ情報がありません。"
     files_by_name: dict[str, discord.File] = {}
     embeds: list[discord.Embed] = []
+    jobs = []
     if open_item:
-        embeds.append(_build_fest_match_embed_from_item(open_item, "フェスマッチ(オープン)", 0x33CCFF, files_by_name))
+        jobs.append(_build_fest_match_embed_from_item(open_item, "フェスマッチ(オープン)", 0x33CCFF, files_by_name))
     if challenge_item:
-        embeds.append(_build_fest_match_embed_from_item(challenge_item, "フェスマッチ(チャレンジ)", 0x33CCFF, files_by_name))
+        jobs.append(_build_fest_match_embed_from_item(challenge_item, "フェスマッチ(チャレンジ)", 0x33CCFF, files_by_name))
+    embeds.extend(await asyncio.gather(*jobs))
     return embeds, list(files_by_name.values()), None
 
-def _get_fest_match_payload() -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
-    open_data = get_fest_schedule()
-    challenge_data = get_fest_challenge_schedule()
+async def _get_fest_match_payload() -> tuple[list[discord.Embed] | None, list[discord.File] | None, str | None]:
+    open_data, challenge_data = await asyncio.gather(get_fest_schedule(), get_fest_challenge_schedule())
     if not open_data and not challenge_data:
         return None, None, "データの取得に失敗しました。"
     open_item = _get_current_fest_match_item(open_data or {})
     challenge_item = _get_current_fest_match_item(challenge_data or {})
     if not open_item and not challenge_item:
         return None, None, "フェスマッチ情報がありません。"
-    return _build_fest_match_payload(open_item, challenge_item)
+    return await _build_fest_match_payload(open_item, challenge_item)
 
 def _build_fest_match_rotation_key(open_item: dict | None, challenge_item: dict | None) -> str | None:
     parts: list[str] = []
@@ -2006,8 +3333,8 @@ def _build_fest_match_rotation_key(open_item: dict | None, challenge_item: dict
     return "|".join(parts) if parts else None
 
 
-def _get_team_contest_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
-    data = get_team_contest_schedule()
+async def _get_team_contest_payload() -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
+    data = await get_team_contest_schedule()
     if not data:
         return None, None, "データの取得に失敗しました。"
 
@@ -2015,7 +3342,9 @@ def _get_team_contest_payload() -> tuple[discord.Embed | None, list[discord.File
     if not results:
         return None, None, "バイトチームコンテストの予定がありません。"
 
-    contest = results[0]
+    return _build_team_contest_payload_from_item(results[0])
+
+def _build_team_contest_payload_from_item(contest: dict) -> tuple[discord.Embed | None, list[discord.File] | None, str | None]:
     stage = contest.get("stage") or {}
     boss = contest.get("boss") or {}
     weapons = contest.get("weapons") or []
@@ -2064,12 +3393,86 @@ def _get_team_contest_payload() -> tuple[discord.Embed | None, list[discord.File
 
     return embed, list(files_by_name.values()), None
 
+# コマンド名 -> {"count", "errors", "samples": {区間: 直近の所要秒数}}
+_COMMAND_METRICS: dict[str, dict] = {}
+_COMMAND_METRIC_PHASES = ("ack_age", "build", "send", "total")
+
+def _record_command_timing(command: str, error: bool, **phases: float) -> None:
+    metrics = _COMMAND_METRICS.setdefault(
+        command,
+        {
+            "count": 0,
+            "errors": 0,
+            "samples": {phase: deque(maxlen=COMMAND_METRICS_WINDOW) for phase in _COMMAND_METRIC_PHASES},
+        },
+    )
+    metrics["count"] += 1
+    if error:
+        metrics["errors"] += 1
+    for phase, seconds in phases.items():
+        metrics["samples"][phase].append(seconds)
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+async def _respond_deferred(interaction: discord.Interaction, command: str, payload) -> None:
+    """先に defer して3秒の応答期限内に受け付け、payload (embeds, files, error) を待ってから followup で送る"""
+    started = time.perf_counter()
+    try:
+        await interaction.response.defer(thinking=True)
+    except Exception:
+        if inspect.iscoroutine(payload):
+            payload.close()
+        raise
+    acked = time.perf_counter()
+    # Discord がインタラクションを作ってから受け付けるまでの時間 (3秒までの余裕を見る)
+    ack_age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+
+    error = None
+    try:
+        embeds, files, error = await payload
+    except Exception as e:
+        print(f"Error building /{command}: {e}")
+        embeds, files, error = None, None, "データの取得に失敗しました。"
+    built = time.perf_counter()
+
+    if isinstance(embeds, discord.Embed):
+        embeds = [embeds]
+    if error or not embeds:
+        # 考え中のメッセージは全員に見えるので消し、エラーは本人にだけ返す
+        try:
+            await interaction.delete_original_response()
+        except discord.HTTPException:
+            pass
+        await _queue_followup(
+            interaction, lambda: interaction.followup.send(error or "データの取得に失敗しました。", ephemeral=True)
+        )
+    else:
+        blobs = _snapshot_files(files)
+        await _queue_followup(
+            interaction,
+            lambda: _send_with_attachment_cache(interaction.followup.send, embeds=embeds, files=_files_from_snapshot(blobs)),
+        )
+    done = time.perf_counter()
+
+    _record_command_timing(
+        command,
+        bool(error),
+        ack_age=ack_age,
+        build=built - acked,
+        send=done - built,
+        total=done - started,
+    )
+
 async def _send_stage_embed(ctx, schedule_index: int, title: str):
-    embeds, files, error = _get_stage_payload(schedule_index=schedule_index, title_prefix=title)
+    embeds, files, error = await _get_stage_payload(schedule_index=schedule_index, title_prefix=title)
     if error:
         await ctx.send(error)
         return
-    await ctx.send(embeds=embeds, files=files)
+    await _send_with_attachment_cache(ctx.send, embeds=embeds, files=files)
 
 @bot.command(name="next")
 async def next_stage(ctx):
@@ -2084,40 +3487,28 @@ async def now(ctx):
 @bot.command(name="fest_match_now")
 async def fest_match_now(ctx):
     """/fest_match_now で現在のフェスマッチ(オープン/チャレンジ)を通知"""
-    embeds, files, error = _get_fest_match_payload()
+    embeds, files, error = await _get_fest_match_payload()
     if error:
         await ctx.send(error)
         return
-    await ctx.send(embeds=embeds, files=files)
+    await _send_with_attachment_cache(ctx.send, embeds=embeds, files=files)
 
 @bot.tree.command(name="now", description="現在のステージを表示します")
 async def now_slash(interaction: discord.Interaction):
-    embeds, files, error = _get_stage_payload(schedule_index=0, title_prefix="現在のステージ情報")
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embeds=embeds, files=files)
+    await _respond_deferred(interaction, "now", _get_stage_payload(schedule_index=0, title_prefix="現在のステージ情報"))
 
 @bot.tree.command(name="fest_match_now", description="現在のフェスマッチ(オープン/チャレンジ)を表示します")
 async def fest_match_now_slash(interaction: discord.Interaction):
-    embeds, files, error = _get_fest_match_payload()
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embeds=embeds, files=files)
+    await _respond_deferred(interaction, "fest_match_now", _get_fest_match_payload())
 
 @bot.tree.command(name="next", description="次のステージを表示します")
 async def next_slash(interaction: discord.Interaction):
-    embeds, files, error = _get_stage_payload(schedule_index=1, title_prefix="つぎのステージ情報")
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embeds=embeds, files=files)
+    await _respond_deferred(interaction, "next", _get_stage_payload(schedule_index=1, title_prefix="つぎのステージ情報"))
 
 @bot.tree.command(name="all-next", description="取得できる全ての時間帯のステージを表示します")
 async def all_next_slash(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    data = get_stages()
+    data = await get_stages()
     if not data:
         await _send_ephemeral_text(interaction, "データの取得に失敗しました。")
         return
@@ -2132,27 +3523,20 @@ async def all_next_slash(interaction: discord.Interaction):
     if max_len == 0:
         await _send_ephemeral_text(interaction, "ステージ情報がありません。")
         return
-    payloads: list[tuple[list[discord.Embed] | None, list[discord.File] | None]] = []
-    for idx in range(max_len):
-        embeds, files = _build_mode_embeds(res, schedule_index=idx, title_prefix="ステージ情報")
-        payloads.append((embeds, files))
-    if not payloads:
-        await _send_ephemeral_text(interaction, "ステージ情報がありません。")
-        return
-    await _send_ephemeral_payloads(interaction, payloads)
+    builders = [
+        functools.partial(_build_mode_embeds, res, schedule_index=idx, title_prefix="ステージ情報")
+        for idx in range(max_len)
+    ]
+    await _send_slot_pages(interaction, builders, "ステージ情報がありません。")
 
 @bot.tree.command(name="salmon", description="現在のサーモンランを表示します")
 async def salmon_slash(interaction: discord.Interaction):
-    embed, files, error = _get_salmon_payload()
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embed=embed, files=files)
+    await _respond_deferred(interaction, "salmon", _get_salmon_payload())
 
 @bot.tree.command(name="all-salmon", description="取得できる全ての時間帯のサーモンランを表示します")
 async def all_salmon_slash(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    data = get_salmon_schedule()
+    data = await get_salmon_schedule()
     if not data:
         await _send_ephemeral_text(interaction, "データの取得に失敗しました。")
         return
@@ -2160,37 +3544,21 @@ async def all_salmon_slash(interaction: discord.Interaction):
     if not results:
         await _send_ephemeral_text(interaction, "サーモンランの情報がありません。")
         return
-    payloads: list[tuple[list[discord.Embed] | None, list[discord.File] | None]] = []
-    for item in results:
-        embed, files, error = _build_salmon_payload_from_item(item)
-        if error or not embed:
-            continue
-        payloads.append(([embed], files))
-    if not payloads:
-        await _send_ephemeral_text(interaction, "サーモンランの情報がありません。")
-        return
-    await _send_ephemeral_payloads(interaction, payloads)
+    builders = [lambda item=item: _as_embed_payload(_build_salmon_payload_from_item(item)) for item in results]
+    await _send_slot_pages(interaction, builders, "サーモンランの情報がありません。")
 
 @bot.tree.command(name="team_contest", description="バイトチームコンテストを表示します")
 async def team_contest_slash(interaction: discord.Interaction):
-    embed, files, error = _get_team_contest_payload()
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embed=embed, files=files)
+    await _respond_deferred(interaction, "team_contest", _get_team_contest_payload())
 
 @bot.tree.command(name="event", description="イベントマッチを表示します")
 async def event_slash(interaction: discord.Interaction):
-    embed, files, error = _get_event_payload()
-    if error:
-        await interaction.response.send_message(error, ephemeral=True)
-        return
-    await interaction.response.send_message(embed=embed, files=files)
+    await _respond_deferred(interaction, "event", _get_event_payload())
 
 @bot.tree.command(name="all-event", description="取得できる全ての時間帯のイベントマッチを表示します")
 async def all_event_slash(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    data = get_event_schedule()
+    data = await get_event_schedule()
     if not data:
         await _send_ephemeral_text(interaction, "データの取得に失敗しました。")
         return
@@ -2198,33 +3566,32 @@ async def all_event_slash(interaction: discord.Interaction):
     if not results:
         await _send_ephemeral_text(interaction, "イベントマッチの情報がありません。")
         return
-    payloads: list[tuple[list[discord.Embed] | None, list[discord.File] | None]] = []
-    for item in results:
-        embed, files, error = _build_event_payload_from_item(item, "イベントマッチ情報", None)
-        if error or not embed:
-            continue
-        payloads.append(([embed], files))
-    if not payloads:
-        await _send_ephemeral_text(interaction, "イベントマッチの情報がありません。")
-        return
-    await _send_ephemeral_payloads(interaction, payloads)
+    builders = [
+        lambda item=item: _as_embed_payload(_build_event_payload_from_item(item, "イベントマッチ情報", None))
+        for item in results
+    ]
+    await _send_slot_pages(interaction, builders, "イベントマッチの情報がありません。")
 
 @bot.tree.command(name="gear", description="ゲソタウンのギア更新情報を表示します")
 async def gear_slash(interaction: discord.Interaction):
     await interaction.response.defer()
-    data = get_gear_data()
+    data, _ = await asyncio.gather(get_gear_data(), _ensure_locale())
     if not data:
-        await interaction.followup.send("データの取得に失敗しました。", ephemeral=True)
+        await _queue_followup(interaction, lambda: interaction.followup.send("データの取得に失敗しました。", ephemeral=True))
         return
-    embeds, files, error = _build_gear_payloads(data)
+    embeds, files, error = await _build_gear_payloads(data)
     if error:
-        await interaction.followup.send(error, ephemeral=True)
+        await _queue_followup(interaction, lambda: interaction.followup.send(error, ephemeral=True))
         return
-    await interaction.followup.send(embeds=embeds, files=files)
+    blobs = _snapshot_files(files)
+    await _queue_followup(
+        interaction,
+        lambda: _send_with_attachment_cache(interaction.followup.send, embeds=embeds, files=_files_from_snapshot(blobs)),
+    )
 
 @bot.tree.command(name="monthly_gear", description="サーモンランの月替わりギアを表示します")
 async def monthly_gear_slash(interaction: discord.Interaction):
-    data = get_coop_data()
+    data, _ = await asyncio.gather(get_coop_data(), _ensure_locale())
     if not data:
         await interaction.response.send_message("データの取得に失敗しました。", ephemeral=True)
         return
@@ -2232,11 +3599,11 @@ async def monthly_gear_slash(interaction: discord.Interaction):
     if error:
         await interaction.response.send_message(error, ephemeral=True)
         return
-    await interaction.response.send_message(embed=embed, files=files)
+    await _send_with_attachment_cache(interaction.response.send_message, embed=embed, files=files, interaction=interaction)
 
 @bot.tree.command(name="fest", description="フェス情報を表示します")
 async def fest_slash(interaction: discord.Interaction):
-    data = get_festivals_data()
+    data = await get_festivals_data()
     if not data:
         await interaction.response.send_message("データの取得に失敗しました。", ephemeral=True)
         return
@@ -2248,12 +3615,12 @@ async def fest_slash(interaction: discord.Interaction):
     if error:
         await interaction.response.send_message(error, ephemeral=True)
         return
-    await interaction.response.send_message(embed=embed, files=files)
+    await _send_with_attachment_cache(interaction.response.send_message, embed=embed, files=files, interaction=interaction)
 
 @bot.tree.command(name="all-fest", description="取得できる全てのフェス情報を表示します")
 async def all_fest_slash(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    data = get_festivals_data()
+    data = await get_festivals_data()
     if not data:
         await _send_ephemeral_text(interaction, "データの取得に失敗しました。")
         return
@@ -2262,21 +3629,13 @@ async def all_fest_slash(interaction: discord.Interaction):
     if not records:
         await _send_ephemeral_text(interaction, "フェス情報がありません。")
         return
-    payloads: list[tuple[list[discord.Embed] | None, list[discord.File] | None]] = []
-    for record in records:
-        embed, files, error = _build_fest_payload_from_record(record)
-        if error or not embed:
-            continue
-        payloads.append(([embed], files))
-    if not payloads:
-        await _send_ephemeral_text(interaction, "フェス情報がありません。")
-        return
-    await _send_ephemeral_payloads(interaction, payloads)
+    builders = [lambda record=record: _as_embed_payload(_build_fest_payload_from_record(record)) for record in records]
+    await _send_slot_pages(interaction, builders, "フェス情報がありません。")
 
 
 @bot.tree.command(name="xrank", description="Xランキング（タカオカ）のトップ100を表示します")
 async def xrank_slash(interaction: discord.Interaction):
-    data = get_xrank_data()
+    data = await get_xrank_data()
     if not data:
         await interaction.response.send_message("データの取得に失敗しました。", ephemeral=True)
         return
@@ -2289,6 +3648,34 @@ async def xrank_slash(interaction: discord.Interaction):
     file_obj = discord.File(fp=io.BytesIO(text.encode("utf-8")), filename="xrank_top100.txt")
     await interaction.response.send_message(embed=embed, file=file_obj)
 
+@bot.tree.command(name="stats", description="コマンドの応答時間と送信キューの状況を表示します")
+async def stats_slash(interaction: discord.Interaction):
+    embed = discord.Embed(title="【応答時間】", color=0x6C8EBF)
+    if not _COMMAND_METRICS:
+        embed.description = "まだ記録がありません。"
+    for command, metrics in sorted(_COMMAND_METRICS.items()):
+        samples = metrics["samples"]
+        lines = [f"回数: {metrics['count']} (エラー {metrics['errors']})"]
+        for phase, label in (("ack_age", "受付"), ("build", "作成"), ("send", "送信"), ("total", "合計")):
+            values = samples[phase]
+            lines.append(f"{label}: p50 {_percentile(values, 0.5):.2f}s / p95 {_percentile(values, 0.95):.2f}s")
+        # 受付の p95 が3秒の応答期限に対してどれだけ余裕があるか
+        lines.append(f"応答期限まで: {3.0 - _percentile(samples['ack_age'], 0.95):.2f}s")
+        embed.add_field(name=f"/{command}", value="\n".join(lines), inline=True)
+    queue = _OUTBOUND.stats()
+    lines = [
+        f"送信: {queue['sent']} (まとめた通知 {queue['batched']} / 429 {queue['rate_limited']}"
+        f" / 取り消し {queue['skipped']})"
+    ]
+    for priority, label in _SEND_PRIORITY_LABELS.items():
+        waits = queue["waits"][priority]
+        lines.append(
+            f"{label}: 待ち {queue['depth'][priority]}件 / "
+            f"p50 {_percentile(waits, 0.5):.2f}s / p95 {_percentile(waits, 0.95):.2f}s"
+        )
+    embed.add_field(name="送信キュー", value="\n".join(lines), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="help", description="コマンド一覧を表示します")
 async def help_slash(interaction: discord.Interaction):
     embed = discord.Embed(title="コマンド一覧", color=0x6C8EBF)
@@ -2306,7 +3693,8 @@ async def help_slash(interaction: discord.Interaction):
             "/all-fest\n"
             "/gear\n"
             "/monthly_gear\n"
-            "/xrank"
+            "/xrank\n"
+            "/stats"
         ),
         inline=False,
     )
@@ -2320,7 +3708,8 @@ async def help_slash(interaction: discord.Interaction):
             "/fest_notify_here\n"
             "/gear_notify_here\n"
             "/monthly_gear_notify_here\n"
-            "/xrank_notify_here"
+            "/xrank_notify_here\n"
+            "/notify_stop"
         ),
         inline=False,
     )
@@ -2331,182 +3720,236 @@ async def help_slash(interaction: discord.Interaction):
     )
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="notify_here", description="ステージ自動通知の送信先をこのチャンネルに設定します")
-async def notify_here_slash(interaction: discord.Interaction):
+async def _handle_notify_here(interaction: discord.Interaction, feature: str, *jobs: str) -> None:
     if interaction.channel_id is None:
         await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
         return
-    _update_state({"stage_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをステージ自動通知の送信先に設定しました。", ephemeral=True)
+    label = _NOTIFY_FEATURES[feature][0]
+    if not _subscribe_notify_channel(feature, int(interaction.channel_id)):
+        await interaction.response.send_message(f"このチャンネルは既に{label}自動通知の送信先です。", ephemeral=True)
+        return
+    for job in jobs or (feature,):
+        _request_job_run(job)
+    await interaction.response.send_message(f"このチャンネルを{label}自動通知の送信先に追加しました。", ephemeral=True)
 
+@bot.tree.command(name="notify_here", description="ステージ自動通知の送信先をこのチャンネルに追加します")
+async def notify_here_slash(interaction: discord.Interaction):
+    await _handle_notify_here(interaction, "stage")
 
-@bot.tree.command(name="event_notify_here", description="イベントマッチ自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="event_notify_here", description="イベントマッチ自動通知の送信先をこのチャンネルに追加します")
 async def event_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"event_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをイベントマッチ自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "event")
 
-@bot.tree.command(name="salmon_notify_here", description="サーモンラン自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="salmon_notify_here", description="サーモンラン自動通知の送信先をこのチャンネルに追加します")
 async def salmon_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"salmon_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをサーモンラン自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "salmon")
 
-@bot.tree.command(name="team_contest_notify_here", description="バイトチームコンテスト自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="team_contest_notify_here", description="バイトチームコンテスト自動通知の送信先をこのチャンネルに追加します")
 async def team_contest_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"team_contest_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをバイトチームコンテスト自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "team_contest")
 
-@bot.tree.command(name="fest_notify_here", description="フェス自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="fest_notify_here", description="フェス自動通知の送信先をこのチャンネルに追加します")
 async def fest_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"fest_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをフェス自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "fest", "fest", "fest_stage")
 
-@bot.tree.command(name="gear_notify_here", description="ギア更新自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="gear_notify_here", description="ギア更新自動通知の送信先をこのチャンネルに追加します")
 async def gear_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"gear_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをギア更新自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "gear")
 
-@bot.tree.command(name="monthly_gear_notify_here", description="サーモンラン月替わりギア自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="monthly_gear_notify_here", description="サーモンラン月替わりギア自動通知の送信先をこのチャンネルに追加します")
 async def monthly_gear_notify_here_slash(interaction: discord.Interaction):
-    if interaction.channel_id is None:
-        await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
-        return
-    _update_state({"coop_monthly_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをサーモンラン月替わりギア自動通知の送信先に設定しました。", ephemeral=True)
+    await _handle_notify_here(interaction, "coop_monthly", "gear")
 
-@bot.tree.command(name="xrank_notify_here", description="Xランキング自動通知の送信先をこのチャンネルに設定します")
+@bot.tree.command(name="xrank_notify_here", description="Xランキング自動通知の送信先をこのチャンネルに追加します")
 async def xrank_notify_here_slash(interaction: discord.Interaction):
+    await _handle_notify_here(interaction, "xrank")
+
+@bot.tree.command(name="notify_stop", description="このチャンネルへの自動通知を停止します")
+@app_commands.describe(feature="停止する通知 (省略するとすべて)")
+@app_commands.choices(
+    feature=[app_commands.Choice(name=label, value=key) for key, (label, _) in _NOTIFY_FEATURES.items()]
+)
+async def notify_stop_slash(interaction: discord.Interaction, feature: app_commands.Choice[str] | None = None):
     if interaction.channel_id is None:
         await interaction.response.send_message("この場所では設定できません。", ephemeral=True)
         return
-    _update_state({"xrank_notify_channel_id": int(interaction.channel_id)})
-    await interaction.response.send_message("このチャンネルをXランキング自動通知の送信先に設定しました。", ephemeral=True)
+    features = [feature.value] if feature is not None else list(_NOTIFY_FEATURES)
+    removed = [key for key in features if _unsubscribe_notify_channel(key, int(interaction.channel_id))]
+    if not removed:
+        await interaction.response.send_message("このチャンネルには停止できる自動通知がありません。", ephemeral=True)
+        return
+    labels = "、".join(_NOTIFY_FEATURES[key][0] for key in removed)
+    await interaction.response.send_message(f"このチャンネルへの自動通知を停止しました: {labels}", ephemeral=True)
 
 
 _did_sync_app_commands = False
 
-@tasks.loop(minutes=1)
-async def _stage_auto_notify_loop():
-    state = _load_state()
-    channel_id = int(state.get("stage_notify_channel_id") or STAGE_NOTIFY_CHANNEL_ID or 0)
-    if not channel_id:
-        return
-    if _is_fest_active():
-        return
-
-    data = get_stages()
-    if not data:
-        return
+# (通知の種類, ローテーションキー) -> 開始前に作っておいたペイロード
+_PREPARED_PAYLOADS: dict[tuple[str, str], asyncio.Future] = {}
+# 通知の種類 -> (ローテーションキー, 開始時刻に投稿するタスク)
+_SCHEDULED_PUBLISHES: dict[str, tuple[str, asyncio.Task]] = {}
+_NOTIFY_LOCKS: dict[str, asyncio.Lock] = {}
 
-    rotation_key = _get_stage_rotation_key(data)
-    if not rotation_key:
-        return
+def _notify_lock(feature: str) -> asyncio.Lock:
+    # 定期実行と開始時刻の投稿が重なっても二重に送らないようにする
+    lock = _NOTIFY_LOCKS.get(feature)
+    if lock is None:
+        lock = _NOTIFY_LOCKS[feature] = asyncio.Lock()
+    return lock
 
-    last_key = state.get("stage_last_rotation_key")
-    if last_key is None:
-        _update_state({"stage_last_rotation_key": rotation_key})
-        if not STAGE_NOTIFY_ON_START:
-            return
+def _close_payload_files(payload) -> None:
+    try:
+        for f in payload[1] or []:
+            f.close()
+    except Exception:
+        pass
 
-    if last_key == rotation_key:
+def _discard_prepared_payload(future: asyncio.Future | None) -> None:
+    # 使われなかったペイロードの添付を閉じる。まだ作成中なら作成ごと止める
+    if future is None:
         return
-
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
+    if not future.done():
+        future.cancel()
+    elif not future.cancelled() and future.exception() is None:
+        _close_payload_files(future.result())
+
+def _schedule_prepared_publish(feature: str, rotation_key: str | None, start_raw: str | None, build, publish) -> None:
+    """次のローテーションが近ければ先にペイロードを作っておき、開始時刻ちょうどに publish(at) を呼ぶ"""
+    if NOTIFY_PRECOMPUTE_LEAD_SECONDS <= 0 or not rotation_key or not start_raw:
         return
-
-    embeds, files, error = _get_stage_payload(schedule_index=0, title_prefix="現在のステージ情報")
-    if error:
+    try:
+        start_ts = _parse_iso_datetime(start_raw).timestamp()
+    except Exception:
         return
-    last_message_id = state.get("stage_last_message_id")
-    if last_message_id:
-        try:
-            old_msg = await channel.fetch_message(int(last_message_id))
-            await old_msg.delete()
-        except Exception:
-            pass
-
-    sent = await channel.send(embeds=embeds, files=files)
+    lead = start_ts - time.time()
+    if lead <= 0 or lead > NOTIFY_PRECOMPUTE_LEAD_SECONDS:
+        return
+    scheduled = _SCHEDULED_PUBLISHES.get(feature)
+    if scheduled is not None:
+        if scheduled[0] == rotation_key and not scheduled[1].done():
+            return
+        if scheduled[1] is not asyncio.current_task():
+            scheduled[1].cancel()
+    task = asyncio.ensure_future(_prepare_and_publish(feature, rotation_key, start_ts, build, publish))
+    _SCHEDULED_PUBLISHES[feature] = (rotation_key, task)
 
-    _update_state(
-        {
-            "stage_last_rotation_key": rotation_key,
-            "stage_last_message_id": int(sent.id),
-        }
-    )
+async def _prepare_and_publish(feature: str, rotation_key: str, start_ts: float, build, publish) -> None:
+    key = (feature, rotation_key)
+    try:
+        # 毎時0分に描画が集中しないよう、準備を始める時刻を開始前の猶予の中でばらす
+        spread = max(0.0, start_ts - time.time() - NOTIFY_PRECOMPUTE_MIN_LEAD_SECONDS)
+        await asyncio.sleep(random.uniform(0.0, spread))
+        payload = build()
+        if inspect.isawaitable(payload):
+            future = asyncio.ensure_future(payload)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(payload)
+        _discard_prepared_payload(_PREPARED_PAYLOADS.pop(key, None))
+        _PREPARED_PAYLOADS[key] = future
+        await asyncio.sleep(max(0.0, start_ts - time.time()))
+        await publish(datetime.fromtimestamp(start_ts).astimezone())
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Error publishing prepared {feature} notification: {e}")
+    finally:
+        # 使われなかったペイロードは捨てる
+        _discard_prepared_payload(_PREPARED_PAYLOADS.pop(key, None))
 
-@tasks.loop(minutes=1)
-async def _event_auto_notify_loop():
-    state = _load_state()
-    channel_id = _resolve_notify_channel_id(state, "event_notify_channel_id", EVENT_NOTIFY_CHANNEL_ID)
-    if not channel_id:
-        return
-    if _is_fest_active():
-        return
+async def _take_prepared_payload(feature: str, rotation_key: str):
+    task = _PREPARED_PAYLOADS.pop((feature, rotation_key), None)
+    if task is None:
+        return None
+    try:
+        payload = await task
+    except asyncio.CancelledError:
+        _discard_prepared_payload(task)
+        raise
+    except Exception as e:
+        print(f"Error preparing {feature} notification: {e}")
+        return None
+    if payload[2]:
+        # エラーのペイロードでも作りかけの添付は閉じておく
+        _close_payload_files(payload)
+        return None
+    return payload
 
-    data = get_event_schedule()
-    if not data:
-        return
+async def _notify_stage(at: datetime, data: dict | None = None) -> None:
+    async with _notify_lock("stage"):
+        state = _load_state()
+        channel_ids = _notify_channel_ids(state, "stage")
+        if not channel_ids:
+            return
+        if await _is_fest_active(at):
+            return
 
-    current = _get_current_event_item(data)
-    if not current:
-        return
+        data = data or await get_stages()
+        if not data:
+            return
 
-    rotation_key = current.get("start_time")
-    if not rotation_key:
-        return
+        upcoming = _find_next_item(data.get("result", {}).get("regular") or [], at)
+        if upcoming:
+            upcoming_start = upcoming.get("start_time")
+            _schedule_prepared_publish(
+                "stage",
+                upcoming_start,
+                upcoming_start,
+                lambda: _build_stage_payload_at(data, _parse_iso_datetime(upcoming_start), "現在のステージ情報"),
+                lambda when: _notify_stage(when, data),
+            )
 
-    last_key = state.get("event_last_rotation_key")
-    if last_key is None:
-        _update_state({"event_last_rotation_key": rotation_key})
-        if not EVENT_NOTIFY_ON_START:
+        rotation_key = _get_stage_rotation_key(data, at)
+        if not rotation_key:
             return
 
-    if last_key == rotation_key:
-        return
+        last_key = state.get("stage_last_rotation_key")
+        if last_key is None:
+            _update_state({"stage_last_rotation_key": rotation_key})
+            if not STAGE_NOTIFY_ON_START:
+                return
 
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
-        return
+        if last_key == rotation_key:
+            return
 
-    embed, files, error = _build_event_payload_from_item(current, "イベントマッチ開始", "開催中")
-    if error:
-        return
-    await channel.send(embed=embed, files=files)
+        embeds, files, error = (
+            await _take_prepared_payload("stage", rotation_key)
+            or await _build_stage_payload_at(data, at, "現在のステージ情報")
+        )
+        if error:
+            return
+        sent = await _fan_out_notification(
+            channel_ids, embeds=embeds, files=files, replace_message_ids=_last_message_ids(state, "stage")
+        )
+        if not sent:
+            return
 
-    _update_state({"event_last_rotation_key": rotation_key})
+        _update_state({"stage_last_rotation_key": rotation_key, **_last_message_updates(state, "stage", sent)})
 
-@tasks.loop(minutes=1)
-async def _salmon_auto_notify_loop():
-    if not _acquire_lock("salmon_auto_notify"):
-        return
-    state = _load_state()
-    try:
-        channel_id = _resolve_notify_channel_id(state, "salmon_notify_channel_id", SALMON_NOTIFY_CHANNEL_ID)
-        if not channel_id:
+async def _notify_event(at: datetime, data: dict | None = None) -> None:
+    async with _notify_lock("event"):
+        state = _load_state()
+        channel_ids = _notify_channel_ids(state, "event")
+        if not channel_ids:
             return
-        if _is_fest_active():
+        if await _is_fest_active(at):
             return
 
-        data = get_salmon_schedule()
+        data = data or await get_event_schedule()
         if not data:
             return
 
-        current = _get_current_salmon_item(data)
+        upcoming = _find_next_item(data.get("results") or [], at)
+        if upcoming:
+            _schedule_prepared_publish(
+                "event",
+                upcoming.get("start_time"),
+                upcoming.get("start_time"),
+                lambda: _build_event_payload_from_item(upcoming, "イベントマッチ開始", "開催中"),
+                lambda when: _notify_event(when, data),
+            )
+
+        current = _get_current_event_item(data, at)
         if not current:
             return
 
@@ -2514,228 +3957,258 @@ async def _salmon_auto_notify_loop():
         if not rotation_key:
             return
 
-        last_key = state.get("salmon_last_rotation_key")
+        last_key = state.get("event_last_rotation_key")
         if last_key is None:
-            _update_state({"salmon_last_rotation_key": rotation_key})
-            if not SALMON_NOTIFY_ON_START:
+            _update_state({"event_last_rotation_key": rotation_key})
+            if not EVENT_NOTIFY_ON_START:
                 return
 
         if last_key == rotation_key:
             return
 
-        channel = await _get_text_channel(channel_id)
-        if channel is None:
-            return
-
-        embed, files, error = _get_salmon_payload()
+        embed, files, error = (
+            await _take_prepared_payload("event", rotation_key)
+            or await _build_event_payload_from_item(current, "イベントマッチ開始", "開催中")
+        )
         if error:
             return
-        await channel.send(embed=embed, files=files)
-
-        _update_state({"salmon_last_rotation_key": rotation_key})
-    finally:
-        _release_lock("salmon_auto_notify")
-
-@tasks.loop(minutes=1)
-async def _team_contest_auto_notify_loop():
-    state = _load_state()
-    channel_id = _resolve_notify_channel_id(state, "team_contest_notify_channel_id", TEAM_CONTEST_NOTIFY_CHANNEL_ID)
-    if not channel_id:
-        return
-    if _is_fest_active():
-        return
-
-    data = get_team_contest_schedule()
-    if not data:
-        return
-
-    current = _get_current_team_contest_item(data)
-    if not current:
-        return
+        if not await _fan_out_notification(channel_ids, embed=embed, files=files):
+            return
 
-    rotation_key = current.get("start_time")
-    if not rotation_key:
-        return
+        _update_state({"event_last_rotation_key": rotation_key})
 
-    last_key = state.get("team_contest_last_rotation_key")
-    if last_key is None:
-        _update_state({"team_contest_last_rotation_key": rotation_key})
-        if not TEAM_CONTEST_NOTIFY_ON_START:
+async def _notify_salmon(at: datetime, data: dict | None = None) -> None:
+    async with _notify_lock("salmon"):
+        if not _acquire_lock("salmon_auto_notify"):
             return
+        state = _load_state()
+        try:
+            channel_ids = _notify_channel_ids(state, "salmon")
+            if not channel_ids:
+                return
+            if await _is_fest_active(at):
+                return
 
-    if last_key == rotation_key:
-        return
-
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
-        return
+            data = data or await get_salmon_schedule()
+            if not data:
+                return
 
-    embed, files, error = _get_team_contest_payload()
-    if error:
-        return
-    await channel.send(embed=embed, files=files)
+            upcoming = _find_next_item(data.get("results") or [], at)
+            if upcoming:
+                _schedule_prepared_publish(
+                    "salmon",
+                    upcoming.get("start_time"),
+                    upcoming.get("start_time"),
+                    lambda: _build_salmon_payload_from_item(upcoming),
+                    lambda when: _notify_salmon(when, data),
+                )
+
+            current = _get_current_salmon_item(data, at)
+            if not current:
+                return
 
-    _update_state({"team_contest_last_rotation_key": rotation_key})
+            rotation_key = current.get("start_time")
+            if not rotation_key:
+                return
 
-@tasks.loop(minutes=1)
-async def _fest_auto_notify_loop():
-    state = _load_state()
-    channel_id = _resolve_notify_channel_id(state, "fest_notify_channel_id", FEST_NOTIFY_CHANNEL_ID)
-    if not channel_id:
-        return
+            last_key = state.get("salmon_last_rotation_key")
+            if last_key is None:
+                _update_state({"salmon_last_rotation_key": rotation_key})
+                if not SALMON_NOTIFY_ON_START:
+                    return
 
-    data = get_festivals_data()
-    if not data:
-        return
+            if last_key == rotation_key:
+                return
 
-    current = _get_current_fest_record(data)
-    if not current:
-        return
+            embed, files, error = (
+                await _take_prepared_payload("salmon", rotation_key)
+                or await _build_salmon_payload_from_item(current)
+            )
+            if error:
+                return
+            if not await _fan_out_notification(channel_ids, embed=embed, files=files):
+                return
 
-    rotation_key = current.get("startTime")
-    if not rotation_key:
-        return
+            _update_state({"salmon_last_rotation_key": rotation_key})
+        finally:
+            _release_lock("salmon_auto_notify")
 
-    last_key = state.get("fest_last_rotation_key")
-    if last_key is None:
-        _update_state({"fest_last_rotation_key": rotation_key})
-        if not FEST_NOTIFY_ON_START:
+async def _notify_team_contest(at: datetime, data: dict | None = None) -> None:
+    async with _notify_lock("team_contest"):
+        state = _load_state()
+        channel_ids = _notify_channel_ids(state, "team_contest")
+        if not channel_ids:
+            return
+        if await _is_fest_active(at):
             return
 
-    if last_key == rotation_key:
-        return
+        data = data or await get_team_contest_schedule()
+        if not data:
+            return
 
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
-        return
+        upcoming = _find_next_item(data.get("results") or [], at)
+        if upcoming:
+            _schedule_prepared_publish(
+                "team_contest",
+                upcoming.get("start_time"),
+                upcoming.get("start_time"),
+                lambda: _build_team_contest_payload_from_item(upcoming),
+                lambda when: _notify_team_contest(when, data),
+            )
 
-    embed, files, error = _build_fest_payload_from_record(current)
-    if error:
-        return
-    await channel.send(embed=embed, files=files)
+        current = _get_current_team_contest_item(data, at)
+        if not current:
+            return
 
-    _update_state({"fest_last_rotation_key": rotation_key})
+        rotation_key = current.get("start_time")
+        if not rotation_key:
+            return
 
-@tasks.loop(minutes=1)
-async def _fest_stage_auto_notify_loop():
-    state = _load_state()
-    channel_id = _resolve_notify_channel_id(state, "fest_notify_channel_id", FEST_NOTIFY_CHANNEL_ID)
-    if not channel_id:
-        return
+        last_key = state.get("team_contest_last_rotation_key")
+        if last_key is None:
+            _update_state({"team_contest_last_rotation_key": rotation_key})
+            if not TEAM_CONTEST_NOTIFY_ON_START:
+                return
 
-    open_data = get_fest_schedule()
-    challenge_data = get_fest_challenge_schedule()
-    if not open_data and not challenge_data:
-        return
+        if last_key == rotation_key:
+            return
 
-    open_item = _get_current_fest_match_item(open_data or {})
-    challenge_item = _get_current_fest_match_item(challenge_data or {})
-    if not open_item and not challenge_item:
-        return
+        embed, files, error = (
+            await _take_prepared_payload("team_contest", rotation_key)
+            or _build_team_contest_payload_from_item(current)
+        )
+        if error:
+            return
+        if not await _fan_out_notification(channel_ids, embed=embed, files=files):
+            return
 
-    rotation_key = _build_fest_match_rotation_key(open_item, challenge_item)
-    if not rotation_key:
-        return
+        _update_state({"team_contest_last_rotation_key": rotation_key})
 
-    last_key = state.get("fest_stage_last_rotation_key")
-    if last_key is None:
-        _update_state({"fest_stage_last_rotation_key": rotation_key})
-        if not FEST_NOTIFY_ON_START:
+async def _notify_fest(at: datetime, data: dict | None = None) -> None:
+    async with _notify_lock("fest"):
+        state = _load_state()
+        channel_ids = _notify_channel_ids(state, "fest")
+        if not channel_ids:
             return
 
-    if last_key == rotation_key:
-        return
+        data = data or await get_festivals_data()
+        if not data:
+            return
 
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
-        return
+        upcoming = _find_next_item(_fest_records(data), at)
+        if upcoming:
+            _schedule_prepared_publish(
+                "fest",
+                upcoming.get("startTime"),
+                upcoming.get("startTime"),
+                lambda: _build_fest_payload_from_record(upcoming),
+                lambda when: _notify_fest(when, data),
+            )
 
-    embeds, files, error = _build_fest_match_payload(open_item, challenge_item)
-    if error:
-        return
+        current = _get_current_fest_record(data, at)
+        if not current:
+            return
 
-    last_message_id = state.get("fest_stage_last_message_id")
-    if last_message_id:
-        try:
-            old_msg = await channel.fetch_message(int(last_message_id))
-            await old_msg.delete()
-        except Exception:
-            pass
+        rotation_key = current.get("startTime")
+        if not rotation_key:
+            return
 
-    sent = await channel.send(embeds=embeds, files=files)
-    _update_state(
-        {
-            "fest_stage_last_rotation_key": rotation_key,
-            "fest_stage_last_message_id": int(sent.id),
-        }
-    )
+        last_key = state.get("fest_last_rotation_key")
+        if last_key is None:
+            _update_state({"fest_last_rotation_key": rotation_key})
+            if not FEST_NOTIFY_ON_START:
+                return
 
+        if last_key == rotation_key:
+            return
 
-@tasks.loop(minutes=10)
-async def _gear_auto_notify_loop():
-    if not _acquire_lock("gear_auto_notify"):
-        return
-    state = _load_state()
-    try:
-        channel_id = _resolve_notify_channel_id(state, "gear_notify_channel_id", GEAR_NOTIFY_CHANNEL_ID)
-        if not channel_id:
+        embed, files, error = (
+            await _take_prepared_payload("fest", rotation_key)
+            or _build_fest_payload_from_record(current)
+        )
+        if error:
             return
-        if _is_fest_active():
+        if not await _fan_out_notification(channel_ids, embed=embed, files=files):
             return
 
-        gear_data = get_gear_data()
-        if not gear_data:
+        _update_state({"fest_last_rotation_key": rotation_key})
+
+async def _notify_fest_stage(at: datetime, open_data: dict | None = None, challenge_data: dict | None = None) -> None:
+    async with _notify_lock("fest_stage"):
+        state = _load_state()
+        channel_ids = _notify_channel_ids(state, "fest")
+        if not channel_ids:
             return
 
-        try:
-            gesotown = gear_data.get("data", {}).get("gesotown", {})
-        except Exception:
+        if open_data is None and challenge_data is None:
+            open_data, challenge_data = await asyncio.gather(get_fest_schedule(), get_fest_challenge_schedule())
+        if not open_data and not challenge_data:
             return
 
-        pickup = gesotown.get("pickupBrand") or {}
-        limited = gesotown.get("limitedGears") or []
-        pickup_items = _normalize_gear_items(pickup.get("brandGears") or [])
-        limited_items = _normalize_gear_items(limited)
-
-        gear_state = _load_gear_notify_state()
-        last_limited_sig = gear_state.get("gesotown_limited_sig")
-        last_pickup_sig = gear_state.get("gesotown_pickup_sig")
-        current_limited_sig = _gear_items_signature(limited_items)
-        current_pickup_sig = _pickup_signature(pickup, pickup_items)
-        first_seen = last_limited_sig is None and last_pickup_sig is None
-
-        if first_seen:
-            _update_gear_notify_state(
-                {
-                    "gesotown_limited_sig": current_limited_sig,
-                    "gesotown_pickup_sig": current_pickup_sig,
-                    "gesotown_limited_items": _serialize_gear_items(limited_items),
-                    "gesotown_pickup_items": _serialize_gear_items(pickup_items),
-                }
+        open_next = _find_next_item((open_data or {}).get("results") or [], at)
+        challenge_next = _find_next_item((challenge_data or {}).get("results") or [], at)
+        if open_next or challenge_next:
+            _schedule_prepared_publish(
+                "fest_stage",
+                _build_fest_match_rotation_key(open_next, challenge_next),
+                (open_next or challenge_next).get("start_time"),
+                lambda: _build_fest_match_payload(open_next, challenge_next),
+                lambda when: _notify_fest_stage(when, open_data, challenge_data),
             )
-            if not GEAR_NOTIFY_ON_START:
+
+        open_item = _get_current_fest_match_item(open_data or {}, at)
+        challenge_item = _get_current_fest_match_item(challenge_data or {}, at)
+        if not open_item and not challenge_item:
+            return
+
+        rotation_key = _build_fest_match_rotation_key(open_item, challenge_item)
+        if not rotation_key:
+            return
+
+        last_key = state.get("fest_stage_last_rotation_key")
+        if last_key is None:
+            _update_state({"fest_stage_last_rotation_key": rotation_key})
+            if not FEST_NOTIFY_ON_START:
                 return
 
-        channel = await _get_text_channel(channel_id)
-        if channel is None:
+        if last_key == rotation_key:
             return
 
-        if last_limited_sig != current_limited_sig:
-            prev_limited = gear_state.get("gesotown_limited_items") or []
-            prev_by_key = {_gear_item_key(item): item for item in prev_limited}
-            cur_by_key = {_gear_item_key(item): item for item in limited_items}
-            added_keys = set(cur_by_key.keys()) - set(prev_by_key.keys())
-            removed_items = [prev_by_key[key] for key in prev_by_key.keys() if key not in cur_by_key]
+        embeds, files, error = (
+            await _take_prepared_payload("fest_stage", rotation_key)
+            or await _build_fest_match_payload(open_item, challenge_item)
+        )
+        if error:
+            return
 
-            embeds, files, error = _build_gear_rotation_payload(limited_items, added_keys, removed_items)
-            if not error:
-                await channel.send(embeds=embeds, files=files)
+        sent = await _fan_out_notification(
+            channel_ids, embeds=embeds, files=files, replace_message_ids=_last_message_ids(state, "fest_stage")
+        )
+        if not sent:
+            return
+        _update_state({"fest_stage_last_rotation_key": rotation_key, **_last_message_updates(state, "fest_stage", sent)})
 
-        if last_pickup_sig != current_pickup_sig:
-            embeds, files, error = _build_pickup_payload(pickup, pickup_items)
-            if not error:
-                await channel.send(embeds=embeds, files=files)
 
+async def _notify_gear_rotation(channel_ids: list[int], gear_data: dict) -> bool:
+    """ギアの入れ替わりを通知する。状態を更新できたら True を返す"""
+    try:
+        gesotown = gear_data.get("data", {}).get("gesotown", {})
+    except Exception:
+        return False
+
+    pickup = gesotown.get("pickupBrand") or {}
+    limited = gesotown.get("limitedGears") or []
+    pickup_items = _normalize_gear_items(pickup.get("brandGears") or [])
+    limited_items = _normalize_gear_items(limited)
+
+    gear_state = _load_gear_notify_state()
+    last_limited_sig = gear_state.get("gesotown_limited_sig")
+    last_pickup_sig = gear_state.get("gesotown_pickup_sig")
+    current_limited_sig = _gear_items_signature(limited_items)
+    current_pickup_sig = _pickup_signature(pickup, pickup_items)
+    first_seen = last_limited_sig is None and last_pickup_sig is None
+
+    if first_seen:
         _update_gear_notify_state(
             {
                 "gesotown_limited_sig": current_limited_sig,
@@ -2744,46 +4217,93 @@ async def _gear_auto_notify_loop():
                 "gesotown_pickup_items": _serialize_gear_items(pickup_items),
             }
         )
+        if not GEAR_NOTIFY_ON_START:
+            return True
+
+    if last_limited_sig != current_limited_sig:
+        prev_limited = gear_state.get("gesotown_limited_items") or []
+        prev_by_key = {_gear_item_key(item): item for item in prev_limited}
+        cur_by_key = {_gear_item_key(item): item for item in limited_items}
+        added_keys = set(cur_by_key.keys()) - set(prev_by_key.keys())
+        removed_items = [prev_by_key[key] for key in prev_by_key.keys() if key not in cur_by_key]
+
+        embeds, files, error = await _build_gear_rotation_payload(limited_items, added_keys, removed_items)
+        if not error:
+            await _fan_out_notification(channel_ids, embeds=embeds, files=files)
+
+    if last_pickup_sig != current_pickup_sig:
+        embeds, files, error = await _build_pickup_payload(pickup, pickup_items)
+        if not error:
+            await _fan_out_notification(channel_ids, embeds=embeds, files=files)
+
+    _update_gear_notify_state(
+        {
+            "gesotown_limited_sig": current_limited_sig,
+            "gesotown_pickup_sig": current_pickup_sig,
+            "gesotown_limited_items": _serialize_gear_items(limited_items),
+            "gesotown_pickup_items": _serialize_gear_items(pickup_items),
+        }
+    )
+    return True
 
-        coop_data = get_coop_data()
-        if not coop_data:
+async def _notify_coop_monthly_gear(state: dict, coop_data: dict) -> bool:
+    """サーモンラン月替わりギアの更新を通知する。状態を更新できたら True を返す"""
+    monthly = coop_data.get("data", {}).get("coopResult", {}).get("monthlyGear") or {}
+    monthly_id = monthly.get("__splatoon3ink_id") or monthly.get("name")
+    if not monthly_id:
+        return False
+
+    last_monthly = state.get("coop_monthly_gear_id")
+    if last_monthly is None:
+        _update_state({"coop_monthly_gear_id": monthly_id})
+        return True
+
+    if last_monthly != monthly_id:
+        monthly_channel_ids = _notify_channel_ids(state, "coop_monthly")
+        if monthly_channel_ids:
+            embed, files, error = _build_coop_monthly_payload(coop_data)
+            if not error:
+                await _fan_out_notification(monthly_channel_ids, embed=embed, files=files)
+        _update_state({"coop_monthly_gear_id": monthly_id})
+    return True
+
+async def _notify_gear(at: datetime) -> None:
+    if not _acquire_lock("gear_auto_notify"):
+        return
+    state = _load_state()
+    try:
+        channel_ids = _notify_channel_ids(state, "gear")
+        if not channel_ids:
             return
-        monthly = coop_data.get("data", {}).get("coopResult", {}).get("monthlyGear") or {}
-        monthly_id = monthly.get("__splatoon3ink_id") or monthly.get("name")
-        if not monthly_id:
+        if await _is_fest_active(at):
             return
 
-        last_monthly = state.get("coop_monthly_gear_id")
-        if last_monthly is None:
-            _update_state({"coop_monthly_gear_id": monthly_id})
+        gear_data, _ = await asyncio.gather(get_gear_data(), _ensure_locale())
+        if not gear_data:
             return
+        # 304 または本文が前回と同じなら、正規化・署名・描画をまとめて省略する
+        if _response_changed(GEAR_API_URL, "gear_notify"):
+            if await _notify_gear_rotation(channel_ids, gear_data):
+                _mark_response_seen(GEAR_API_URL, "gear_notify")
 
-        if last_monthly != monthly_id:
-            monthly_channel_id = _resolve_notify_channel_id(
-                state,
-                "coop_monthly_notify_channel_id",
-                COOP_MONTHLY_NOTIFY_CHANNEL_ID,
-            )
-            if monthly_channel_id:
-                monthly_channel = await _get_text_channel(monthly_channel_id)
-                if monthly_channel is not None:
-                    embed, files, error = _build_coop_monthly_payload(coop_data)
-                    if not error:
-                        await monthly_channel.send(embed=embed, files=files)
-            _update_state({"coop_monthly_gear_id": monthly_id})
+        coop_data = await get_coop_data()
+        if not coop_data:
+            return
+        if _response_changed(COOP_API_URL, "coop_monthly_notify"):
+            if await _notify_coop_monthly_gear(state, coop_data):
+                _mark_response_seen(COOP_API_URL, "coop_monthly_notify")
     finally:
         _release_lock("gear_auto_notify")
 
-@tasks.loop(minutes=1)
-async def _xrank_daily_notify_loop():
+async def _notify_xrank(at: datetime) -> None:
     state = _load_state()
-    channel_id = _resolve_notify_channel_id(state, "xrank_notify_channel_id", XRANK_NOTIFY_CHANNEL_ID)
-    if not channel_id:
+    channel_ids = _notify_channel_ids(state, "xrank")
+    if not channel_ids:
         return
-    if _is_fest_active():
+    if await _is_fest_active(at):
         return
 
-    data = get_xrank_data()
+    data = await get_xrank_data()
     if not data:
         return
 
@@ -2794,7 +4314,7 @@ async def _xrank_daily_notify_loop():
     except Exception:
         return
 
-    now = datetime.now().astimezone()
+    now = at
     if not (now.year == end_time.year and now.month == end_time.month and now.day == end_time.day):
         return
     if not (now.hour == 0 and now.minute <= 5):
@@ -2808,17 +4328,212 @@ async def _xrank_daily_notify_loop():
     if not text:
         return
 
-    channel = await _get_text_channel(channel_id)
-    if channel is None:
-        return
-
     embed = discord.Embed(title="【Xランキング トップ100】", color=0x4DA3FF)
     embed.add_field(name="更新", value=last_update_fmt, inline=True)
     file_obj = discord.File(fp=io.BytesIO(text.encode("utf-8")), filename="xrank_top100.txt")
-    await channel.send(embed=embed, file=file_obj)
+    if not await _fan_out_notification(channel_ids, embed=embed, files=[file_obj]):
+        return
 
     _update_state({"xrank_last_sent_date": today_key})
 
+# 時刻として扱うキー (スケジュールの境界になる)
+_BOUNDARY_KEYS = ("start_time", "end_time", "startTime", "endTime", "saleEndTime")
+
+def _collect_boundaries(data, out: list[float]) -> None:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in _BOUNDARY_KEYS and isinstance(value, str):
+                try:
+                    out.append(_parse_iso_datetime(value).timestamp())
+                except Exception:
+                    pass
+            elif isinstance(value, (dict, list)):
+                _collect_boundaries(value, out)
+    elif isinstance(data, list):
+        for value in data:
+            _collect_boundaries(value, out)
+
+def _cached_boundaries(*urls: str) -> list[float] | None:
+    """キャッシュ済みのレスポンスに含まれる開始/終了時刻を返す (どれも未取得なら None)"""
+    boundaries: list[float] = []
+    found = False
+    for url in urls:
+        entry = _RESPONSE_CACHE.get(url)
+        if entry is None:
+            continue
+        found = True
+        _collect_boundaries(entry["data"], boundaries)
+    return boundaries if found else None
+
+def _xrank_boundaries() -> list[float] | None:
+    # X ランキングはシーズン最終日の 0:00 (ローカル時刻) に通知する
+    entry = _RESPONSE_CACHE.get(XRANK_API_URL)
+    if entry is None:
+        return None
+    cur = (entry["data"] or {}).get("data", {}).get("xRanking", {}).get("currentSeason", {})
+    try:
+        end_time = _parse_iso_datetime(cur.get("endTime") or "").astimezone()
+    except Exception:
+        return []
+    midnight = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [midnight.timestamp()] + (_cached_boundaries(FESTIVALS_API_URL) or [])
+
+# ジョブ名 -> (実行する通知処理, 境界時刻を返す関数)
+_SCHEDULER_JOBS = {
+    "stage": (lambda at: _notify_stage(at), lambda: _cached_boundaries(API_URL, FESTIVALS_API_URL)),
+    "event": (lambda at: _notify_event(at), lambda: _cached_boundaries(EVENT_API_URL, FESTIVALS_API_URL)),
+    "salmon": (lambda at: _notify_salmon(at), lambda: _cached_boundaries(SALMON_API_URL, FESTIVALS_API_URL)),
+    "team_contest": (
+        lambda at: _notify_team_contest(at),
+        lambda: _cached_boundaries(TEAM_CONTEST_API_URL, FESTIVALS_API_URL),
+    ),
+    "fest": (lambda at: _notify_fest(at), lambda: _cached_boundaries(FESTIVALS_API_URL)),
+    "fest_stage": (
+        lambda at: _notify_fest_stage(at),
+        lambda: _cached_boundaries(FEST_API_URL, FEST_CHALLENGE_API_URL),
+    ),
+    "gear": (lambda at: _notify_gear(at), lambda: _cached_boundaries(GEAR_API_URL, FESTIVALS_API_URL)),
+    "xrank": (lambda at: _notify_xrank(at), _xrank_boundaries),
+}
+
+_SCHEDULER_TASK: asyncio.Task | None = None
+_SCHEDULER_WAKE: asyncio.Event | None = None
+# ジョブ名 -> 次に起こす時刻。ヒープの古い要素はこれと一致しなければ捨てる
+_SCHEDULER_NEXT_WAKE: dict[str, float] = {}
+_SCHEDULER_HEAP: list[tuple[float, int, str]] = []
+_SCHEDULER_SEQ = itertools.count()
+# 実行中のジョブ名 -> タスク (途中で GC されないよう、止めるときにキャンセルできるよう持っておく)
+_SCHEDULER_RUNNING: dict[str, asyncio.Task] = {}
+# 実行中に再実行を頼まれたジョブ。終わったらすぐにもう一度実行する
+_SCHEDULER_RERUN: set[str] = set()
+
+def _next_job_wakeup(name: str, now_ts: float) -> float:
+    boundaries = _SCHEDULER_JOBS[name][1]()
+    if boundaries is None:
+        # まだ何も取得できていない (通知先が未設定など) ので、ゆっくり様子を見る
+        return now_ts + SCHEDULER_IDLE_POLL_SECONDS
+    candidates = [now_ts + SCHEDULER_MAX_SLEEP_SECONDS]
+    for boundary in boundaries:
+        if boundary + SCHEDULER_RECHECK_DELAY_SECONDS[1] <= now_ts:
+            continue
+        # 同じ境界なら毎回同じ時刻になるよう、ずらし幅はジョブと境界から決める
+        jitter = random.Random(f"{name}:{boundary}")
+        # 事前描画が始められる時刻と、境界直後・数分後の確認 (上流の更新遅れ対策)
+        candidates.append(boundary - NOTIFY_PRECOMPUTE_LEAD_SECONDS + 5)
+        candidates.append(boundary + jitter.uniform(*SCHEDULER_VERIFY_DELAY_SECONDS))
+        candidates.append(boundary + jitter.uniform(*SCHEDULER_RECHECK_DELAY_SECONDS))
+    return min(c for c in candidates if c > now_ts)
+
+def _schedule_job(name: str, wake_ts: float) -> None:
+    _SCHEDULER_NEXT_WAKE[name] = wake_ts
+    heapq.heappush(_SCHEDULER_HEAP, (wake_ts, next(_SCHEDULER_SEQ), name))
+    if _SCHEDULER_WAKE is not None:
+        _SCHEDULER_WAKE.set()
+
+def _request_job_run(name: str) -> None:
+    """通知先の変更などで、次の境界を待たずにジョブを実行させる"""
+    if name in _SCHEDULER_JOBS:
+        _schedule_job(name, time.time())
+
+async def _run_scheduled_job(name: str) -> None:
+    try:
+        await _SCHEDULER_JOBS[name][0](datetime.now().astimezone())
+    except Exception as e:
+        print(f"Error in scheduled {name} notification: {e}")
+    finally:
+        if _SCHEDULER_RUNNING.get(name) is asyncio.current_task():
+            del _SCHEDULER_RUNNING[name]
+    # キャンセル (スケジューラの停止) されたときは次回を決めない。再開時にすぐ実行される
+    if name in _SCHEDULER_RERUN:
+        _SCHEDULER_RERUN.discard(name)
+        _schedule_job(name, time.time())
+    elif name not in _SCHEDULER_NEXT_WAKE:
+        _schedule_job(name, _next_job_wakeup(name, time.time()))
+
+async def _rotation_scheduler() -> None:
+    """全通知を1つのタイマーヒープで回し、次のローテーション境界まで眠る"""
+    global _SCHEDULER_WAKE
+    _SCHEDULER_WAKE = asyncio.Event()
+    now_ts = time.time()
+    for name in _SCHEDULER_JOBS:
+        if name not in _SCHEDULER_NEXT_WAKE:
+            _schedule_job(name, now_ts)
+    while True:
+        _SCHEDULER_WAKE.clear()
+        while _SCHEDULER_HEAP and _SCHEDULER_NEXT_WAKE.get(_SCHEDULER_HEAP[0][2]) != _SCHEDULER_HEAP[0][0]:
+            heapq.heappop(_SCHEDULER_HEAP)
+        if not _SCHEDULER_HEAP:
+            await _SCHEDULER_WAKE.wait()
+            continue
+        wake_ts, _, name = _SCHEDULER_HEAP[0]
+        delay = wake_ts - time.time()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(_SCHEDULER_WAKE.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        heapq.heappop(_SCHEDULER_HEAP)
+        del _SCHEDULER_NEXT_WAKE[name]
+        if name in _SCHEDULER_RUNNING:
+            # 前回の実行がまだ終わっていない。その間に通知先が変わったかもしれないので、終わったらすぐもう一度実行する
+            _SCHEDULER_RERUN.add(name)
+            continue
+        _SCHEDULER_RUNNING[name] = asyncio.ensure_future(_run_scheduled_job(name))
+
+def _start_rotation_scheduler() -> None:
+    global _SCHEDULER_TASK
+    if _SCHEDULER_TASK is None or _SCHEDULER_TASK.done():
+        _SCHEDULER_TASK = asyncio.ensure_future(_rotation_scheduler())
+
+def _stop_rotation_scheduler() -> None:
+    global _SCHEDULER_TASK
+    task = _SCHEDULER_TASK
+    _SCHEDULER_TASK = None
+    if task is not None:
+        task.cancel()
+    # 実行中の通知も止める
+    for job_task in _SCHEDULER_RUNNING.values():
+        job_task.cancel()
+    _SCHEDULER_RUNNING.clear()
+    _SCHEDULER_RERUN.clear()
+    # 開始時刻待ちの投稿も止め、作っておいたペイロードの添付を閉じる
+    for _, publish_task in _SCHEDULED_PUBLISHES.values():
+        publish_task.cancel()
+    _SCHEDULED_PUBLISHES.clear()
+    for key in list(_PREPARED_PAYLOADS):
+        _discard_prepared_payload(_PREPARED_PAYLOADS.pop(key, None))
+
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    _forget_attachment_urls(payload.channel_id, payload.message_id)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    for message_id in payload.message_ids:
+        _forget_attachment_urls(payload.channel_id, message_id)
+
+@bot.event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    # 埋め込みの展開などでも編集イベントは来るので、添付が差し替わったときだけ捨てる
+    attachments = (payload.data or {}).get("attachments")
+    if attachments is None:
+        return
+    kept = {attachment.get("filename") for attachment in attachments}
+    source = (int(payload.channel_id), int(payload.message_id))
+    for filename in list(_ATTACHMENT_URL_SOURCES.get(source, ())):
+        if filename not in kept:
+            _drop_cached_attachment_url(filename)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    _forget_attachment_urls(channel.id)
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    for channel in [*guild.channels, *guild.threads]:
+        _forget_attachment_urls(channel.id)
+
 @bot.event
 async def on_ready():
     global _did_sync_app_commands
@@ -2827,27 +4542,18 @@ async def on_ready():
         await bot.tree.sync()
         _did_sync_app_commands = True
     await bot.change_presence(activity=discord.Game(name=BOT_ACTIVITY_NAME))
-    if not _stage_auto_notify_loop.is_running():
-        _stage_auto_notify_loop.start()
-    if not _event_auto_notify_loop.is_running():
-        _event_auto_notify_loop.start()
-    if not _salmon_auto_notify_loop.is_running():
-        _salmon_auto_notify_loop.start()
-    if not _team_contest_auto_notify_loop.is_running():
-        _team_contest_auto_notify_loop.start()
-    if not _fest_auto_notify_loop.is_running():
-        _fest_auto_notify_loop.start()
-    if not _fest_stage_auto_notify_loop.is_running():
-        _fest_stage_auto_notify_loop.start()
-    if not _gear_auto_notify_loop.is_running():
-        _gear_auto_notify_loop.start()
-    if not _xrank_daily_notify_loop.is_running():
-        _xrank_daily_notify_loop.start()
+    _start_rotation_scheduler()
+    # 再接続のたびにも呼ばれるので、長く動かしていてもキャッシュが膨らみ続けない
+    await asyncio.to_thread(_prune_gear_image_cache)
 
 if __name__ == "__main__":
     if not os.getenv("DISCORD_TOKEN"):
         _load_dotenv()
 
+    _build_asset_index()
+    if FONT_PRELOAD:
+        _preload_fonts()
+
     token = os.getenv("DISCORD_TOKEN", "")
     if not token:
         raise RuntimeError("環境変数 DISCORD_TOKEN に Discord Bot Token を設定してください。")